@@ -0,0 +1,71 @@
+"""Compare the memory and set operation throughput of a PermSet against a
+RankPermSet holding the same random permutations.
+
+Usage:
+	PYTHONPATH=. python benchmarks/rankset.py [length] [count]
+
+from the root of the repository, or with permpy installed.
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from permpy import PermSet, RankPermSet
+from permpy.permarray import from_array
+from permpy.montecarlo import random_permutations
+
+def build(make, perms):
+	"""Return make(perms), the time taken and the memory it holds."""
+	gc.disable()
+	tracemalloc.start()
+	start = time.perf_counter()
+	result = make(perms)
+	elapsed = time.perf_counter() - start
+	size, _ = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+	gc.enable()
+	return result, elapsed, size
+
+def timed(operation):
+	"""Return the time taken by operation(), with the garbage collector off
+	(as in `timeit`), since scanning the many live Permutations would
+	otherwise dominate.
+	"""
+	gc.disable()
+	start = time.perf_counter()
+	operation()
+	elapsed = time.perf_counter() - start
+	gc.enable()
+	return elapsed
+
+def main(length=12, count=500000):
+	first = random_permutations(length, count, rng=0)
+	second = np.concatenate([first[:count//2], random_permutations(length, count - count//2, rng=1)])
+
+	S, set_build, set_bytes = build(lambda rows: PermSet(from_array(rows)), first)
+	T = PermSet(from_array(second))
+	R, rank_build, rank_bytes = build(lambda rows: RankPermSet.from_arrays({length: rows}), first)
+	Q = RankPermSet.from_arrays({length: second})
+
+	print(f"{count} random permutations of length {length}")
+	print(f"  {'':14}{'PermSet':>10}{'RankPermSet':>14}")
+	print(f"  {'bytes/member':14}{set_bytes/count:>10.1f}{rank_bytes/count:>14.1f}")
+	print(f"  {'build':14}{set_build:>9.3f}s{rank_build:>13.3f}s")
+	probes = from_array(second[:100000])
+	for name, set_op, rank_op in [
+			('union', lambda: S | T, lambda: R | Q),
+			('intersection', lambda: S & T, lambda: R & Q),
+			('difference', lambda: S - T, lambda: R - Q),
+			('membership', lambda: [p in S for p in probes], lambda: R.isin(second[:100000])),
+			('iteration', lambda: sum(1 for _ in S), lambda: sum(1 for _ in R)),
+		]:
+		set_time = timed(set_op)
+		rank_time = timed(rank_op)
+		print(f"  {name:14}{set_time:>9.3f}s{rank_time:>13.3f}s ({set_time/rank_time:.1f}x)")
+
+if __name__ == "__main__":
+	main(*[int(arg) for arg in sys.argv[1:]])
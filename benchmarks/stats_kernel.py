@@ -0,0 +1,58 @@
+"""Compare computing the `num_*` statistics one list at a time against the
+fused `stats_record` kernel.
+
+Usage:
+	PYTHONPATH=. python benchmarks/stats_kernel.py [length] [count]
+
+from the root of the repository, or with permpy installed.
+"""
+
+import sys
+import time
+
+from permpy import Permutation
+
+STATISTICS = [
+	'descents',
+	'ascents',
+	'peaks',
+	'valleys',
+	'ltr_min',
+	'rtl_min',
+	'ltr_max',
+	'rtl_max',
+	'fixed_points',
+	'bonds',
+	'inversions',
+]
+
+def old_path(p):
+	"""The statistics as they used to be computed: build each list, take its length."""
+	counts = [len(getattr(p, name)()) for name in STATISTICS]
+	counts.append(sum(p.descents()))
+	return counts
+
+def new_path(p):
+	return list(p.stats_record())
+
+def main(length=50, count=2000):
+	perms = [Permutation.random(length) for _ in range(count)]
+
+	start = time.perf_counter()
+	for p in perms:
+		old_path(p)
+	old_time = time.perf_counter() - start
+
+	for p in perms:
+		p._stats_record = None
+	start = time.perf_counter()
+	for p in perms:
+		new_path(p)
+	new_time = time.perf_counter() - start
+
+	print(f"{count} permutations of length {length}")
+	print(f"  one list per statistic: {old_time:.3f}s")
+	print(f"  fused stats_record:     {new_time:.3f}s ({old_time/new_time:.1f}x)")
+
+if __name__ == "__main__":
+	main(*[int(arg) for arg in sys.argv[1:]])
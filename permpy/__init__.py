@@ -2,6 +2,10 @@ from .permutation import Permutation
 from .permset import PermSet
 from .permclass import PermClass
 from .avclass import AvClass
+from .inflation import InflationEnumerator
+from .statstable import StatsTable
+from .montecarlo import MonteCarlo
+from .rankset import RankPermSet
 
 from .pegpermutation import PegPermutation
 from .pegpermset import PegPermSet
@@ -1,12 +1,16 @@
 from math import factorial
+from collections import Counter
 import logging
 import sys
 import types
 
+import numpy as np
 
 from .permutation import Permutation
 from .permset import PermSet
 from .permclass import PermClass
+from .permmisc import _standardize_values
+from .incremental import resolve_incremental
 
 class AvClass(PermClass):
 	"""An object representing an avoidance class. 
@@ -14,6 +18,11 @@ class AvClass(PermClass):
 	Notes:
 		Does not contain the empty permutation.
 
+		If `statistics` are given (as IncrementalStatistics or the names of
+		built-in ones, see `permpy.incremental`), then `self.refined[n]` is a
+		Counter of the tuples of their values over the permutations of
+		length `n`, kept up to date as the class is extended.
+
 	Examples:
 		>>> B = [123]
 		>>> A = AvClass(B, length=4)
@@ -25,8 +34,10 @@ class AvClass(PermClass):
 		Set of 2 permutations
 		Set of 5 permutations
 		Set of 14 permutations
+		>>> A.refined[4]
+		Counter({(): 14})
 	"""
-	def __init__(self, basis, length=8, verbose=0):
+	def __init__(self, basis, length=8, verbose=0, statistics=None):
 
 		list.__init__(self, [PermSet()])
 		if isinstance(basis, Permutation):
@@ -36,15 +47,43 @@ class AvClass(PermClass):
 		
 		self.test = lambda p: all(b not in p for b in basis)
 
+		self.statistics = [resolve_incremental(stat) for stat in (statistics or [])]
+		self.refined = [Counter()]
+		self._states = {}
+
 		p = Permutation([0], clean=True)
 		if length >= 1:
 			if p not in self.basis:
 				self.append(PermSet(p))
+				self._record_states(self[-1], {Permutation(): self._initial_states()})
 				self.length = 1
 				self.extend_to_length(length)
 			else:
 				for _ in range(length):
 					self.append(PermSet())
+					self.refined.append(Counter())
+
+	def _initial_states(self):
+		return tuple(stat.initial for stat in self.statistics)
+
+	def _child_states(self, states, child):
+		return tuple(stat.update(state, child) for stat, state in zip(self.statistics, states))
+
+	def _values(self, states):
+		return tuple(stat.value(state) for stat, state in zip(self.statistics, states))
+
+	def _record_states(self, level, parent_states):
+		"""Compute the states of the permutations in the new top `level` from
+		those of their parents, and tally their values in `self.refined`.
+		"""
+		self._states = {}
+		if not self.statistics:
+			self.refined.append(Counter({(): len(level)}) if level else Counter())
+			return
+		for p in level:
+			parent = Permutation(_standardize_values(p[:-1], len(p)), clean=True)
+			self._states[p] = self._child_states(parent_states[parent], p)
+		self.refined.append(Counter(self._values(states) for states in self._states.values()))
 
 	def extend_by_one(self, trust=True):
 		"""Extend `self` by right-extending its ultimate PermSet.
@@ -56,6 +95,7 @@ class AvClass(PermClass):
 		logging.debug(f"Calling extend_by_one({self}, trust={trust})")
 		self.length += 1
 		self.append(self[-1].right_extensions(basis=self.basis, trust=trust))
+		self._record_states(self[-1], self._states)
 	
 	def extend_to_length(self, length, trust=True):
 		if length <= self.length:
@@ -68,6 +108,74 @@ class AvClass(PermClass):
 		for n in range(length):
 			self.extend_by_one(trust=trust)
 
+	def refined_counts(self, length, statistics=None, as_array=False):
+		"""Return the joint distributions of the given statistics over the
+		permutations of each length up to `length` in `self`, found by a
+		depth-first search of the generating tree that stores no levels.
+
+		Args:
+			length (int): Longest length to count.
+			statistics (list, optional): IncrementalStatistics, or names of
+				built-in ones. Defaults to `self.statistics`.
+			as_array (bool, optional): Whether to return NumPy arrays, in
+				which the entry at index (v_1, ..., v_k) counts the
+				permutations on which the statistics take the values v_1,
+				..., v_k (which must be nonnegative integers), instead of
+				Counters of value tuples.
+
+		Returns:
+			list whose `n`th entry is the distribution for length `n`.
+
+		Examples:
+			>>> A = AvClass([123], length=0)
+			>>> sorted(A.refined_counts(4, ['num_descents'])[4].items())
+			[((1,), 2), ((2,), 11), ((3,), 1)]
+			>>> A.refined_counts(4, ['num_inversions'], as_array=True)[4]
+			array([0, 0, 1, 4, 5, 3, 1])
+
+		"""
+		if statistics is None:
+			statistics = self.statistics
+		statistics = [resolve_incremental(stat) for stat in statistics]
+		counts = [Counter() for _ in range(length+1)]
+
+		def update(states, child):
+			return tuple(stat.update(state, child) for stat, state in zip(statistics, states))
+		def test(p):
+			return p.avoids(B=self.basis, lr=2)
+
+		root = Permutation([0], clean=True)
+		if length >= 1 and root not in self.basis:
+			stack = [(root, update(tuple(stat.initial for stat in statistics), root))]
+			while stack:
+				p, states = stack.pop()
+				counts[len(p)][tuple(stat.value(state) for stat, state in zip(statistics, states))] += 1
+				if len(p) < length:
+					stack.extend((child, update(states, child)) for child in p.right_extensions(test=test))
+
+		if not as_array:
+			return counts
+		arrays = []
+		for counter in counts:
+			shape = tuple(max(values[idx] for values in counter) + 1 if counter else 0
+						  for idx in range(len(statistics)))
+			array = np.zeros(shape, dtype=object if max(counter.values(), default=0) >= 2**63 else np.int64)
+			for values, count in counter.items():
+				array[values] = count
+			arrays.append(array)
+		return arrays
+
+	def simples(self, n):
+		"""Generate the simple permutations of length `n` in `self`, without
+		generating the rest of the class.
+
+		Examples:
+			>>> sorted(AvClass([2413]).simples(5))
+			[4 1 3 5 2]
+
+		"""
+		return Permutation.gen_simple(n, basis=self.basis)
+
 	def right_juxtaposition(self, C, generate_perms=True):
 		A = PermSet()
 		max_length = max([len(P) for P in self.basis]) + max([len(P) for P in C.basis])
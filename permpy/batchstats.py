@@ -0,0 +1,307 @@
+"""Vectorized versions of the statistics of `Permutation`.
+
+Each kernel takes an (N, n) array of permutations of a single length (see
+`permpy.permarray.to_array`) and returns the length-N array of the values of
+the statistic. `KERNELS` maps the names of the corresponding `Permutation`
+methods to the kernels.
+"""
+
+import math
+from collections import Counter
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+
+def _count(mask):
+	return mask.sum(axis=1, dtype=np.int64)
+
+def num_descents(perms):
+	"""Count the descents of each row of `perms`.
+
+	Examples:
+		>>> num_descents(np.array([[3, 1, 4, 0, 2], [0, 1, 2, 3, 4]]))
+		array([2, 0])
+	"""
+	return _count(perms[:, :-1] > perms[:, 1:])
+
+def num_ascents(perms):
+	return _count(perms[:, :-1] < perms[:, 1:])
+
+def num_peaks(perms):
+	return _count((perms[:, :-2] < perms[:, 1:-1]) & (perms[:, 1:-1] > perms[:, 2:]))
+
+def num_valleys(perms):
+	return _count((perms[:, :-2] > perms[:, 1:-1]) & (perms[:, 1:-1] < perms[:, 2:]))
+
+def num_ltr_min(perms):
+	return _count(perms == np.minimum.accumulate(perms, axis=1))
+
+def num_ltr_max(perms):
+	return _count(perms == np.maximum.accumulate(perms, axis=1))
+
+def num_rtl_min(perms):
+	return num_ltr_min(perms[:, ::-1])
+
+def num_rtl_max(perms):
+	return num_ltr_max(perms[:, ::-1])
+
+def num_fixed_points(perms):
+	return _count(perms == np.arange(perms.shape[1]))
+
+def num_bonds(perms):
+	return _count(np.abs(np.diff(perms, axis=1)) == 1)
+
+def num_inc_bonds(perms):
+	return _count(np.diff(perms, axis=1) == 1)
+
+def num_dec_bonds(perms):
+	return _count(np.diff(perms, axis=1) == -1)
+
+def major_index(perms):
+	"""Sum the (zero-based) positions of the descents of each row of `perms`.
+
+	Examples:
+		>>> major_index(np.array([[3, 1, 4, 0, 2]]))
+		array([2])
+	"""
+	descents = perms[:, :-1] > perms[:, 1:]
+	return (descents * np.arange(perms.shape[1] - 1)).sum(axis=1, dtype=np.int64)
+
+def num_inversions(perms):
+	"""Count the inversions of each row of `perms`.
+
+	Notes:
+		Short rows are handled by comparing each column with those to its
+		right, which takes O(N n^2) time but only n NumPy operations. Longer
+		rows are handed to `_merge_inversions`.
+
+	Examples:
+		>>> num_inversions(np.array([[3, 1, 4, 0, 2], [4, 3, 2, 1, 0]]))
+		array([ 6, 10])
+	"""
+	if perms.shape[1] > _MERGE_THRESHOLD:
+		return _merge_inversions(perms)
+	result = np.zeros(perms.shape[0], dtype=np.int64)
+	for idx in range(perms.shape[1] - 1):
+		result += _count(perms[:, idx:idx+1] > perms[:, idx+1:])
+	return result
+
+_MERGE_THRESHOLD = 64
+
+def _merge_inversions(perms):
+	"""Count the inversions of each row of `perms` by a bottom-up merge sort
+	run on all rows at once, in O(N n log n) time.
+
+	Notes:
+		Rows are padded to a power of two with the value n, which creates no
+		inversions. At each level, the blocks of every row are tagged with a
+		running block number, so one `np.searchsorted` counts, for every
+		entry of a right half, the larger entries of its left half.
+
+	Examples:
+		>>> _merge_inversions(np.array([[3, 1, 4, 0, 2], [4, 3, 2, 1, 0]]))
+		array([ 6, 10])
+	"""
+	count, n = perms.shape
+	size = 1
+	while size < n:
+		size *= 2
+	work = np.full((count, size), n, dtype=np.int64)
+	work[:, :n] = perms
+	result = np.zeros(count, dtype=np.int64)
+	width = 1
+	while width < size:
+		blocks = work.reshape(-1, 2, width)
+		tags = np.arange(blocks.shape[0], dtype=np.int64)[:, None] * (n+1)
+		lefts = (blocks[:, 0, :] + tags).ravel()
+		rights = blocks[:, 1, :] + tags
+		ends = np.searchsorted(lefts, tags + n + 1)
+		larger = ends - np.searchsorted(lefts, rights.ravel(), side='right').reshape(rights.shape)
+		result += larger.sum(axis=1).reshape(count, -1).sum(axis=1)
+		work = np.sort(work.reshape(-1, 2*width), axis=1, kind='stable').reshape(count, size)
+		width *= 2
+	return result
+
+def num_noninversions(perms):
+	n = perms.shape[1]
+	return n*(n-1)//2 - num_inversions(perms)
+
+def breadth(perms):
+	"""Return the least taxicab distance between two entries of each row of
+	`perms` (or the length, for rows of fewer than two entries).
+
+	Examples:
+		>>> breadth(np.array([[2, 0, 3, 1], [0, 1, 2, 3]]))
+		array([3, 2])
+	"""
+	n = perms.shape[1]
+	result = np.full(perms.shape[0], n, dtype=np.int64)
+	wide = perms.astype(np.int64)
+	for offset in range(1, n):
+		# Entries further apart than the best distance so far cannot beat it.
+		if offset >= result.max():
+			break
+		gaps = np.abs(wide[:, offset:] - wide[:, :-offset]).min(axis=1) + offset
+		np.minimum(result, gaps, out=result)
+	return result
+
+def rank_encoding(perms):
+	"""Return the (N, n) array of the rank encodings (Lehmer codes) of the
+	rows of `perms`.
+
+	Examples:
+		>>> rank_encoding(np.array([[2, 4, 0, 3, 1]]))
+		array([[2, 3, 0, 1, 0]])
+	"""
+	code = np.zeros(perms.shape, dtype=np.int64)
+	for idx in range(perms.shape[1] - 1):
+		code[:, idx] = _count(perms[:, idx:idx+1] > perms[:, idx+1:])
+	return code
+
+def from_rank_encoding(codes):
+	"""Return the (N, n) array of the permutations whose rank encodings are
+	the rows of `codes`.
+
+	Examples:
+		>>> from_rank_encoding(np.array([[2, 3, 0, 1, 0]]))
+		array([[2, 4, 0, 3, 1]])
+	"""
+	codes = np.asarray(codes)
+	count, n = codes.shape
+	available = np.ones((count, n), dtype=bool)
+	perms = np.zeros((count, n), dtype=np.int64)
+	rows = np.arange(count)
+	for idx in range(n):
+		# The (code+1)st available value is the first whose running count exceeds the code.
+		ranks = np.cumsum(available, axis=1)
+		vals = np.argmax(ranks > codes[:, idx:idx+1], axis=1)
+		perms[:, idx] = vals
+		available[rows, vals] = False
+	return perms
+
+def cycle_length_counts(perms):
+	"""Return the (N, n+1) array whose entry (i, k) is the number of cycles
+	of length k in row i of `perms`.
+
+	Notes:
+		The rows are taken together as one permutation of N n points, whose
+		cycles are the connected components of its graph. These are found
+		by `scipy.sparse.csgraph.connected_components` in O(N n) time, and
+		then counted by row and size with `np.bincount`.
+
+	Examples:
+		>>> cycle_length_counts(np.array([[1, 0, 2], [1, 2, 0]]))
+		array([[0, 1, 1, 0],
+		       [0, 0, 0, 1]])
+	"""
+	count, n = perms.shape
+	size = count * n
+	if not size:
+		return np.zeros((count, n+1), dtype=np.int64)
+	points = np.arange(size)
+	targets = (perms.astype(np.int64) + (np.arange(count, dtype=np.int64) * n)[:, None]).ravel()
+	graph = csr_matrix((np.ones(size, dtype=np.int8), targets, np.arange(size+1)), shape=(size, size))
+	components, labels = connected_components(graph, directed=True, connection='weak')
+	sizes = np.bincount(labels, minlength=components)
+	rows = np.empty(components, dtype=np.int64)
+	rows[labels] = points // n
+	return np.bincount(rows * (n+1) + sizes, minlength=count*(n+1)).reshape(count, n+1)
+
+def _partition(counts):
+	return tuple(length for length in range(len(counts)-1, 0, -1) for _ in range(counts[length]))
+
+def cycle_types(perms):
+	"""Return a Counter of the cycle types (as weakly decreasing tuples) of
+	the rows of `perms`.
+
+	Examples:
+		>>> import itertools
+		>>> sorted(cycle_types(np.array(list(itertools.permutations(range(3))))).items())
+		[((1, 1, 1), 1), ((2, 1), 3), ((3,), 2)]
+	"""
+	counts, multiplicities = np.unique(cycle_length_counts(perms), axis=0, return_counts=True)
+	return Counter({_partition(row): mult for row, mult in zip(counts.tolist(), multiplicities.tolist())})
+
+def order(perms):
+	"""Return the group-theoretic orders of the rows of `perms`.
+
+	Notes:
+		The orders are accumulated in 64-bit integers. A row whose order
+		would pass 2^63 is finished exactly with Python ints instead, and
+		then the result is an object array.
+
+	Examples:
+		>>> from permpy.montecarlo import random_permutations
+		>>> from permpy import Permutation
+		>>> perms = random_permutations(100000, 20, rng=0)
+		>>> result = order(perms)
+		>>> result.dtype, max(result) > 2**63
+		(dtype('O'), True)
+		>>> result.tolist() == [Permutation(row, clean=True).order() for row in perms.tolist()]
+		True
+	"""
+	counts = cycle_length_counts(perms)
+	result = np.ones(perms.shape[0], dtype=np.int64)
+	exact = np.zeros(perms.shape[0], dtype=bool)
+	limit = np.iinfo(np.int64).max
+	for length in range(2, perms.shape[1]+1):
+		rows = np.flatnonzero((counts[:, length] > 0) & ~exact)
+		quotients = result[rows] // np.gcd(result[rows], length)
+		large = quotients > limit // length
+		exact[rows[large]] = True
+		result[rows[~large]] = quotients[~large] * length
+	if not exact.any():
+		return result
+	result = result.astype(object)
+	for row in np.flatnonzero(exact).tolist():
+		value = 1
+		for length in (np.flatnonzero(counts[row, 1:]) + 1).tolist():
+			value = value * length // math.gcd(value, length)
+		result[row] = value
+	return result
+
+def orders(perms):
+	"""Return a Counter of the group-theoretic orders of the rows of `perms`.
+
+	Examples:
+		>>> import itertools
+		>>> sorted(orders(np.array(list(itertools.permutations(range(4))))).items())
+		[(1, 1), (2, 9), (3, 8), (4, 6)]
+	"""
+	return Counter(order(perms).tolist())
+
+def is_involution(perms):
+	rows = np.arange(perms.shape[0])[:, None]
+	return (perms[rows, perms] == np.arange(perms.shape[1])).all(axis=1)
+
+def is_identity(perms):
+	return (perms == np.arange(perms.shape[1])).all(axis=1)
+
+def trivial(perms):
+	return np.zeros(perms.shape[0], dtype=np.int64)
+
+KERNELS = {
+	'num_descents': num_descents,
+	'num_ascents': num_ascents,
+	'num_peaks': num_peaks,
+	'num_valleys': num_valleys,
+	'num_ltr_min': num_ltr_min,
+	'num_ltr_max': num_ltr_max,
+	'num_rtl_min': num_rtl_min,
+	'num_rtl_max': num_rtl_max,
+	'num_fixed_points': num_fixed_points,
+	'num_bonds': num_bonds,
+	'num_inc_bonds': num_inc_bonds,
+	'num_dec_bonds': num_dec_bonds,
+	'major_index': major_index,
+	'num_inversions': num_inversions,
+	'num_noninversions': num_noninversions,
+	'breadth': breadth,
+	'order': order,
+	'is_involution': is_involution,
+	'is_identity': is_identity,
+	'is_increasing': is_identity,
+	'trivial': trivial,
+}
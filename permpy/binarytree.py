@@ -0,0 +1,218 @@
+"""The decreasing binary plane tree of a permutation, stored as arrays.
+
+The root of the tree of p is its largest entry, with the tree of the entries
+to its left as its left subtree and that of the entries to its right as its
+right subtree. Its postorder reading is the output of West's stack-sorting
+map applied to p.
+"""
+
+from collections import Counter
+
+import numpy as np
+
+
+class DecreasingTree:
+	"""The decreasing binary plane tree of a sequence of distinct values, as
+	built by `decreasing_tree`.
+
+	Nodes are indexed by the positions of their labels in the sequence, and
+	missing nodes are recorded as -1.
+
+	Attributes:
+		labels (tuple): The sequence itself, so `labels[i]` is the label of
+			node i.
+		parent (list): `parent[i]` is the parent of node i.
+		left (list): `left[i]` is the left child of node i.
+		right (list): `right[i]` is the right child of node i.
+		root (int): The node with the largest label, or -1 if the tree is
+			empty.
+
+	"""
+
+	def __init__(self, labels, parent, left, right, root):
+		self.labels = labels
+		self.parent = parent
+		self.left = left
+		self.right = right
+		self.root = root
+
+	def __len__(self):
+		return len(self.labels)
+
+	def __repr__(self):
+		return f"DecreasingTree({list(self.labels)})"
+
+	def depths(self):
+		"""Return the list whose ith entry is the depth of node i, with the
+		root at depth 1.
+
+		Examples:
+			>>> decreasing_tree([1, 3, 2, 7, 6, 5, 4]).depths()
+			[3, 2, 3, 1, 2, 3, 4]
+		"""
+		depths = [0]*len(self)
+		if self.root < 0:
+			return depths
+		depths[self.root] = 1
+		stack = [self.root]
+		while stack:
+			node = stack.pop()
+			for child in (self.left[node], self.right[node]):
+				if child >= 0:
+					depths[child] = depths[node] + 1
+					stack.append(child)
+		return depths
+
+	def depth(self):
+		"""Return the number of levels of the tree.
+
+		Examples:
+			>>> decreasing_tree([1, 3, 2, 7, 6, 5, 4]).depth()
+			4
+		"""
+		return max(self.depths(), default=0)
+
+	def width(self):
+		"""Return the largest number of nodes on a single level of the tree.
+
+		Examples:
+			>>> decreasing_tree([1, 3, 2, 7, 6, 5, 4]).width()
+			3
+		"""
+		return max(Counter(self.depths()).values(), default=0)
+
+	def postorder(self):
+		"""Return the labels of the tree read in postorder (left subtree,
+		right subtree, root).
+
+		Examples:
+			>>> decreasing_tree([2, 3, 1]).postorder()
+			[2, 1, 3]
+		"""
+		reading = []
+		stack = [(self.root, False)] if self.root >= 0 else []
+		while stack:
+			node, expanded = stack.pop()
+			if expanded:
+				reading.append(self.labels[node])
+				continue
+			stack.append((node, True))
+			if self.right[node] >= 0:
+				stack.append((self.right[node], False))
+			if self.left[node] >= 0:
+				stack.append((self.left[node], False))
+		return reading
+
+def decreasing_tree(p):
+	"""Return the DecreasingTree of the sequence `p` of distinct values, in
+	O(n) time.
+
+	Notes:
+		This is a Cartesian tree, built with a stack holding the right spine
+		of the tree of the entries seen so far.
+
+	Examples:
+		>>> T = decreasing_tree([2, 0, 3, 1])
+		>>> T.root, T.parent, T.left, T.right
+		(2, [2, 0, -1, 2], [-1, -1, 0, -1], [1, -1, 3, -1])
+	"""
+	labels = tuple(p)
+	n = len(labels)
+	parent = [-1]*n
+	left = [-1]*n
+	right = [-1]*n
+	spine = []
+	for idx, val in enumerate(labels):
+		last = -1
+		while spine and labels[spine[-1]] < val:
+			last = spine.pop()
+		if last >= 0:
+			left[idx] = last
+			parent[last] = idx
+		if spine:
+			right[spine[-1]] = idx
+			parent[idx] = spine[-1]
+		spine.append(idx)
+	root = spine[0] if spine else -1
+	return DecreasingTree(labels, parent, left, right, root)
+
+def _previous_greater(perms):
+	"""Return the (N, n) array whose entry (r, i) is the position of the
+	nearest entry left of position i in row r that is greater than it, or
+	-1.
+
+	Notes:
+		Each row keeps the stack of `decreasing_tree` as a row of an array.
+		The stacks are decreasing, so the entries to pop are found by a
+		binary search run on every row at once, in O(log n) steps.
+	"""
+	count, n = perms.shape
+	rows = np.arange(count)
+	result = np.empty((count, n), dtype=np.int64)
+	stack = np.empty((count, n+1), dtype=np.int64)
+	values = np.empty((count, n+1), dtype=np.int64)
+	height = np.zeros(count, dtype=np.int64)
+	for idx in range(n):
+		val = perms[:, idx]
+		low, high = np.zeros(count, dtype=np.int64), height
+		active = low < high
+		while active.any():
+			mid = (low + high) // 2
+			greater = values[rows, mid] > val
+			low = np.where(active & greater, mid + 1, low)
+			high = np.where(active & ~greater, mid, high)
+			active = low < high
+		result[:, idx] = np.where(low > 0, stack[rows, low - 1], -1)
+		stack[rows, low] = idx
+		values[rows, low] = val
+		height = low + 1
+	return result
+
+def depths(perms):
+	"""Return the (N, n) array of the depths of the nodes of the trees of
+	the rows of the array `perms`, with the roots at depth 1, in
+	O(n log n) time per row.
+
+	Notes:
+		The parent of node i is the smaller of the nearest greater entries
+		on either side of it (see `_previous_greater`). The depths are then
+		filled in one pass over the values from largest to smallest, since
+		a parent is larger than its children.
+
+	Examples:
+		>>> depths(np.array([[0, 2, 1, 6, 5, 4, 3]]))
+		array([[3, 2, 3, 1, 2, 3, 4]])
+	"""
+	count, n = perms.shape
+	rows = np.arange(count)
+	before = _previous_greater(perms)
+	after = _previous_greater(perms[:, ::-1])[:, ::-1]
+	after = np.where(after >= 0, n - 1 - after, -1)
+	before_values = np.where(before >= 0, np.take_along_axis(perms, np.maximum(before, 0), axis=1), n)
+	after_values = np.where(after >= 0, np.take_along_axis(perms, np.maximum(after, 0), axis=1), n)
+	parent = np.where(before_values < after_values, before, after)
+	positions = np.argsort(perms, axis=1)
+	result = np.empty((count, n), dtype=np.int64)
+	for val in range(n-1, -1, -1):
+		pos = positions[:, val]
+		above = parent[rows, pos]
+		result[rows, pos] = np.where(above >= 0, result[rows, above] + 1, 1)
+	return result
+
+def tree_statistics(perms):
+	"""Return the arrays of the depths and widths of the trees of the rows of
+	the array `perms`, as a dictionary.
+
+	Examples:
+		>>> import itertools
+		>>> stats = tree_statistics(np.array(list(itertools.permutations(range(3)))))
+		>>> stats['depth'].tolist(), stats['width'].tolist()
+		([3, 2, 3, 2, 3, 3], [1, 2, 1, 2, 1, 1])
+	"""
+	count, n = perms.shape
+	levels = depths(perms)
+	if n == 0:
+		return {'depth': np.zeros(count, dtype=np.int64), 'width': np.zeros(count, dtype=np.int64)}
+	offsets = np.arange(count)[:, None] * (n+1)
+	sizes = np.bincount((levels + offsets).ravel(), minlength=count*(n+1)).reshape(count, n+1)
+	return {'depth': levels.max(axis=1), 'width': sizes.max(axis=1)}
@@ -0,0 +1,286 @@
+"""Substitution decomposition trees of permutations.
+
+Every permutation of length at least 2 is uniquely an inflation of a simple
+permutation of length at least 4, or a sum or skew sum whose components are
+themselves decomposed recursively. The tree recording this is built here in
+O(n log n) time, and the interval-related methods of `Permutation` are read
+off of it.
+
+Notes:
+	The construction sweeps the permutation from left to right, keeping a
+	stack of maximal intervals ending just before the current entry, and a
+	segment tree holding (max - min) - (j - i) for every window [i, j]. A
+	window is an interval exactly when that quantity is zero.
+"""
+
+class DecompositionNode:
+	"""A node of a substitution decomposition tree.
+
+	Notes:
+		A node covers the entries of the permutation at positions
+		`start, ..., stop-1`, which form an interval with values
+		`low, ..., high`. Its `kind` is one of 'leaf', 'sum', 'skew', or
+		'simple'. The children of a 'sum' or 'skew' node are never of the
+		same kind as their parent, and the skeleton of a 'simple' node is a
+		simple permutation of length at least 4.
+	"""
+
+	def __init__(self, kind, start, stop, low, high, children=None):
+		self.kind = kind
+		self.start = start
+		self.stop = stop
+		self.low = low
+		self.high = high
+		self.children = children if children is not None else []
+
+	def __len__(self):
+		return self.stop - self.start
+
+	def __repr__(self):
+		if self.kind == 'leaf':
+			return '1'
+		skeleton = ' '.join(str(val+1) for val in self.skeleton())
+		return f"{skeleton}[{', '.join(repr(child) for child in self.children)}]"
+
+	def is_leaf(self):
+		return self.kind == 'leaf'
+
+	def skeleton(self):
+		"""Return the tuple of values of the permutation that `self` inflates.
+
+		Examples:
+			>>> decomposition_tree((1, 3, 0, 2)).skeleton()
+			(1, 3, 0, 2)
+			>>> decomposition_tree((0, 2, 1)).skeleton()
+			(0, 1)
+		"""
+		if self.kind == 'leaf':
+			return (0,)
+		m = len(self.children)
+		if self.kind == 'sum':
+			return tuple(range(m))
+		if self.kind == 'skew':
+			return tuple(range(m-1, -1, -1))
+		order = sorted(range(m), key=lambda idx: self.children[idx].low)
+		ranks = [0]*m
+		for rank, idx in enumerate(order):
+			ranks[idx] = rank
+		return tuple(ranks)
+
+	def nodes(self):
+		"""Generate the nodes of the subtree rooted at `self` in preorder."""
+		stack = [self]
+		while stack:
+			node = stack.pop()
+			yield node
+			stack.extend(reversed(node.children))
+
+class _MinAddTree:
+	"""Segment tree over `range(n)` supporting addition on a range of
+	positions and locating the leftmost position holding the minimum.
+	"""
+
+	def __init__(self, n):
+		size = 1
+		while size < n:
+			size *= 2
+		self.size = size
+		# mins[node] is the minimum of the subtree, including lazy[node] but
+		# none of the lazy additions of its ancestors.
+		self.mins = [0]*(2*size)
+		self.lazy = [0]*(2*size)
+
+	def add(self, lo, hi, delta):
+		"""Add `delta` to every position from `lo` to `hi` (inclusive)."""
+		self._add(1, 0, self.size-1, lo, hi, delta)
+
+	def _add(self, node, node_lo, node_hi, lo, hi, delta):
+		if hi < node_lo or node_hi < lo:
+			return
+		if lo <= node_lo and node_hi <= hi:
+			self.mins[node] += delta
+			self.lazy[node] += delta
+			return
+		mid = (node_lo + node_hi) // 2
+		self._add(2*node, node_lo, mid, lo, hi, delta)
+		self._add(2*node+1, mid+1, node_hi, lo, hi, delta)
+		self.mins[node] = min(self.mins[2*node], self.mins[2*node+1]) + self.lazy[node]
+
+	def leftmost_min(self):
+		"""Return the leftmost position holding the minimum value."""
+		mins = self.mins
+		node = 1
+		while node < self.size:
+			node *= 2
+			if mins[node] > mins[node+1]:
+				node += 1
+		return node - self.size
+
+def decomposition_tree(p):
+	"""Return the root of the substitution decomposition tree of the sequence
+	`p` of distinct integers 0, ..., len(p)-1, or None if `p` is empty.
+
+	Examples:
+		>>> decomposition_tree((1, 3, 0, 2))
+		2 4 1 3[1, 1, 1, 1]
+		>>> decomposition_tree((0, 2, 1, 4, 6, 3, 5))
+		1 2 3[1, 2 1[1, 1], 2 4 1 3[1, 1, 1, 1]]
+	"""
+	n = len(p)
+	if n == 0:
+		return None
+
+	tree = _MinAddTree(n)
+	maxima = [] # positions whose values are decreasing
+	minima = [] # positions whose values are increasing
+	stack = []
+
+	for idx, val in enumerate(p):
+		# Maintain (max - min) - (idx - start) for every window [start, idx].
+		if idx:
+			tree.add(0, idx-1, -1)
+		while maxima and p[maxima[-1]] < val:
+			top = maxima.pop()
+			tree.add(maxima[-1]+1 if maxima else 0, top, val - p[top])
+		maxima.append(idx)
+		while minima and p[minima[-1]] > val:
+			top = minima.pop()
+			tree.add(minima[-1]+1 if minima else 0, top, p[top] - val)
+		minima.append(idx)
+
+		# No interval ending at `idx` starts before `leftmost`.
+		leftmost = tree.leftmost_min()
+		node = DecompositionNode('leaf', idx, idx+1, val, val)
+		while stack and stack[-1].start >= leftmost:
+			top = stack[-1]
+			last = top.children[-1] if top.children else None
+			if (top.kind == 'sum' and last.high + 1 == node.low) \
+					or (top.kind == 'skew' and node.high + 1 == last.low):
+				# Extend a linear node by one more child.
+				stack.pop()
+				top.children.append(node)
+				top.stop = node.stop
+				top.low = min(top.low, node.low)
+				top.high = max(top.high, node.high)
+				node = top
+			elif top.high + 1 == node.low or node.high + 1 == top.low:
+				stack.pop()
+				kind = 'sum' if top.high < node.low else 'skew'
+				node = DecompositionNode(kind, top.start, node.stop,
+					min(top.low, node.low), max(top.high, node.high), [top, node])
+			else:
+				# Gather nodes until they form an interval with `node`, which
+				# is then the inflation of a simple permutation.
+				children = [node]
+				low, high = node.low, node.high
+				while True:
+					top = stack.pop()
+					children.append(top)
+					low = min(low, top.low)
+					high = max(high, top.high)
+					if high - low == idx - top.start:
+						break
+				children.reverse()
+				node = DecompositionNode('simple', top.start, idx+1, low, high, children)
+		stack.append(node)
+
+	return stack[0]
+
+def iter_intervals(root):
+	"""Generate the triples (start, length, low) describing the intervals of
+	length at least 2 of the permutation whose decomposition tree is `root`,
+	in O(1) time per interval.
+
+	Notes:
+		An interval is either a node of the tree or a union of at least two
+		consecutive children of a 'sum' or 'skew' node.
+
+	Examples:
+		>>> sorted(iter_intervals(decomposition_tree((0, 2, 1))))
+		[(0, 3, 0), (1, 2, 1)]
+	"""
+	if root is None:
+		return
+	for node in root.nodes():
+		if node.kind == 'simple':
+			yield (node.start, len(node), node.low)
+		elif node.kind != 'leaf':
+			children = node.children
+			for i, first in enumerate(children):
+				for last in children[i+1:]:
+					low = first.low if node.kind == 'sum' else last.low
+					yield (first.start, last.stop - first.start, low)
+
+def num_intervals(root):
+	"""Return the number of intervals of length at least 2 of the
+	permutation whose decomposition tree is `root`, in O(n) time.
+
+	Examples:
+		>>> num_intervals(decomposition_tree((0, 1, 2, 3)))
+		6
+	"""
+	if root is None:
+		return 0
+	count = 0
+	for node in root.nodes():
+		if node.kind == 'simple':
+			count += 1
+		elif node.kind != 'leaf':
+			m = len(node.children)
+			count += m*(m-1) // 2
+	return count
+
+def is_separable(p):
+	"""Determine whether the sequence `p` of distinct integers 0, ...,
+	len(p)-1 is separable, in O(n) time.
+
+	Notes:
+		The entries are pushed onto a stack of intervals of values, and the
+		top two are merged while they are adjacent in value. The permutation
+		is separable exactly when a single interval remains.
+
+	Examples:
+		>>> is_separable((0, 2, 1, 3))
+		True
+		>>> is_separable((1, 3, 0, 2))
+		False
+	"""
+	lows = []
+	highs = []
+	for val in p:
+		low = high = val
+		while lows and (highs[-1] + 1 == low or high + 1 == lows[-1]):
+			low = min(low, lows.pop())
+			high = max(high, highs.pop())
+		lows.append(low)
+		highs.append(high)
+	return len(lows) <= 1
+
+def separating_tree(p):
+	"""Return the separating tree of the sequence `p` of distinct integers
+	0, ..., len(p)-1, or None if `p` is empty or not separable.
+
+	Notes:
+		This is the same stack of intervals as in `is_separable`, with the
+		merged intervals recorded as 'sum' and 'skew' nodes. Children of the
+		same kind as their parent are absorbed, so the result is the
+		substitution decomposition tree of `p`, built in O(n) time.
+
+	Examples:
+		>>> separating_tree((0, 2, 1, 3))
+		1 2 3[1, 2 1[1, 1], 1]
+		>>> separating_tree((1, 3, 0, 2)) is None
+		True
+	"""
+	stack = []
+	for idx, val in enumerate(p):
+		node = DecompositionNode('leaf', idx, idx+1, val, val)
+		while stack and (stack[-1].high + 1 == node.low or node.high + 1 == stack[-1].low):
+			top = stack.pop()
+			kind = 'sum' if top.high < node.low else 'skew'
+			children = top.children if top.kind == kind else [top]
+			children.extend(node.children if node.kind == kind else [node])
+			node = DecompositionNode(kind, top.start, node.stop,
+				min(top.low, node.low), max(top.high, node.high), children)
+		stack.append(node)
+	return stack[0] if len(stack) == 1 else None
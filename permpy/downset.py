@@ -0,0 +1,222 @@
+"""Downsets of long permutations, computed on permutations packed into
+integers.
+
+A permutation of length m whose entries fit in `bits` bits is packed into a
+single int, with entry i in the field of width w = bits+1 starting at bit
+w*i. The top bit of every field is a guard bit, always 0 in a packed
+permutation, which lets one subtraction compare all the fields with a value
+at once: in (x | H) - (v+1)*L, where H has the guard bits set and L the low
+bit of each field, the guard bit of a field survives exactly when the field
+is greater than v. Deleting an entry and standardizing is then a handful of
+shifts, masks and one subtraction, whatever the length.
+
+As in `Permutation.downset`, each pattern found is tagged with the least
+index deleted to reach it, and only indices from there on are deleted from
+it, so that each set of deleted indices is visited in one order only.
+
+The downsets of whole sets of permutations are instead computed on arrays
+(see `permpy.permarray`): `array_covers` deletes each column from every row
+at once and deduplicates the results in one pass, and `array_downset`
+repeats this level by level.
+"""
+
+import multiprocessing
+
+import numpy as np
+
+from .permutation import Permutation
+from .permarray import array_dtype, lex_ranks
+
+
+def field_bits(n):
+	"""Return the number of bits needed for the entries of a permutation of
+	length `n`.
+	"""
+	return max(1, (n-1).bit_length())
+
+def pack(p, bits):
+	"""Return the permutation `p` packed into an int, with `bits` bits (plus
+	a guard bit) per entry.
+
+	Examples:
+		>>> bin(pack((2, 0, 1), 2))
+		'0b1000010'
+	"""
+	width = bits + 1
+	x = 0
+	for idx, val in enumerate(p):
+		x |= val << (width*idx)
+	return x
+
+def unpack(x, length, bits):
+	"""Return the tuple of entries of the permutation of length `length`
+	packed into `x`.
+
+	Examples:
+		>>> unpack(pack((2, 0, 1), 2), 3, 2)
+		(2, 0, 1)
+	"""
+	width = bits + 1
+	mask = (1 << bits) - 1
+	return tuple((x >> (width*idx)) & mask for idx in range(length))
+
+def _masks(length, bits):
+	"""Return the pair (L, H) of masks of the low bits and of the guard bits
+	of the fields of a packed permutation of length `length`.
+	"""
+	width = bits + 1
+	low = sum(1 << (width*idx) for idx in range(length))
+	return low, low << bits
+
+def _delete_all(task):
+	"""Return the dictionary mapping each pattern of length `length`-1 of
+	the packed permutations in `items` (pairs (x, start)) to the least index
+	deleted to reach it. Run in a worker process for large levels.
+	"""
+	items, length, bits = task
+	width = bits + 1
+	mask = (1 << bits) - 1
+	low, high = _masks(length-1, bits)
+	children = {}
+	for x, start in items:
+		for idx in range(start, length):
+			shift = width*idx
+			val = (x >> shift) & mask
+			y = (x & ((1 << shift) - 1)) | ((x >> (shift + width)) << shift)
+			y -= (((y | high) - (val+1)*low) & high) >> bits
+			if y not in children or idx < children[y]:
+				children[y] = idx
+	return children
+
+def _merge(target, children):
+	for y, idx in children.items():
+		if y not in target or idx < target[y]:
+			target[y] = idx
+
+def iter_packed_downset(p, processes=1, chunk_size=2**14):
+	"""Generate the levels of the downset of `p`, from length len(p) down to
+	0, as dictionaries whose keys are the packed patterns (see `pack`, with
+	`field_bits(len(p))` bits) of that length.
+
+	Args:
+		p (Permutation): The permutation.
+		processes (int): Number of worker processes; levels with more than
+			`chunk_size` patterns are split into chunks of that size and
+			shared among them. 1 means work in this process.
+		chunk_size (int): Number of patterns sent to a worker at once.
+
+	Examples:
+		>>> [len(level) for level in iter_packed_downset(Permutation(2413))]
+		[1, 4, 2, 1, 1]
+	"""
+	n = len(p)
+	bits = field_bits(n)
+	level = {pack(p, bits): 0}
+	yield level
+	pool = multiprocessing.Pool(processes) if processes != 1 else None
+	try:
+		for length in range(n, 0, -1):
+			items = list(level.items())
+			if pool is not None and len(items) > chunk_size:
+				tasks = [(items[start:start+chunk_size], length, bits) for start in range(0, len(items), chunk_size)]
+				level = {}
+				for children in pool.imap_unordered(_delete_all, tasks):
+					_merge(level, children)
+			else:
+				level = _delete_all((items, length, bits))
+			yield level
+	finally:
+		if pool is not None:
+			pool.terminate()
+
+def downset(p, processes=1):
+	"""Return the downset of `p` as a list of sets of Permutations, the ith
+	holding the patterns of length i.
+
+	Examples:
+		>>> [sorted(level) for level in downset(Permutation(231))[1:]]
+		[[1], [1 2, 2 1], [2 3 1]]
+	"""
+	bits = field_bits(len(p))
+	levels = [{Permutation(unpack(x, len(p)-k, bits), clean=True) for x in level}
+		for k, level in enumerate(iter_packed_downset(p, processes))]
+	return levels[::-1]
+
+def downset_profile(p, processes=1):
+	"""Return the list of the numbers of patterns of `p` of each length, from
+	0 to len(p), without building any Permutations.
+
+	Examples:
+		>>> downset_profile(Permutation(2413))
+		[1, 1, 2, 4, 1]
+	"""
+	return [len(level) for level in iter_packed_downset(p, processes)][::-1]
+
+def unique_rows(perms):
+	"""Return the distinct rows of the array `perms`, in lexicographic order.
+
+	Notes:
+		Rows of length at most 20 are compared through their lexicographic
+		ranks, which is much faster than `np.unique` along an axis.
+
+	Examples:
+		>>> unique_rows(np.array([[1, 0], [0, 1], [1, 0]]))
+		array([[0, 1],
+		       [1, 0]])
+	"""
+	if perms.shape[1] <= 20:
+		_, index = np.unique(lex_ranks(perms), return_index=True)
+		return perms[index]
+	return np.unique(perms, axis=0)
+
+def array_covers(perms):
+	"""Return the array of the distinct permutations covered by the rows of
+	`perms`, in lexicographic order.
+
+	Notes:
+		Deleting any entry of a run of bonds gives the same pattern, so an
+		entry is deleted only from the rows where it starts such a run.
+
+	Examples:
+		>>> array_covers(np.array([[0, 1, 3, 2], [2, 0, 1, 3]]))
+		array([[0, 1, 2],
+		       [0, 2, 1],
+		       [1, 0, 2],
+		       [2, 0, 1]])
+	"""
+	count, length = perms.shape
+	if not count or not length:
+		return np.empty((0, max(length-1, 0)), dtype=perms.dtype)
+	pieces = []
+	for idx in range(length):
+		rows = perms if idx == 0 else perms[np.abs(perms[:, idx] - perms[:, idx-1]) != 1]
+		children = np.delete(rows, idx, axis=1)
+		pieces.append(children - (children > rows[:, idx:idx+1]))
+	return unique_rows(np.concatenate(pieces))
+
+def array_downset(perms_by_length):
+	"""Return the downset of a set of permutations, as the list of arrays
+	whose ith entry holds the distinct permutations of length i (in
+	lexicographic order) contained in one of them.
+
+	Args:
+		perms_by_length (dict): Maps each length to the array of the
+			permutations of that length in the set.
+
+	Examples:
+		>>> levels = array_downset({3: np.array([[1, 2, 0]]), 2: np.array([[0, 1]])})
+		>>> [level.tolist() for level in levels]
+		[[[]], [[0]], [[0, 1], [1, 0]], [[1, 2, 0]]]
+	"""
+	if not perms_by_length:
+		return []
+	max_length = max(perms_by_length)
+	levels = [None]*(max_length+1)
+	below = np.empty((0, max_length), dtype=array_dtype(max_length))
+	for length in range(max_length, -1, -1):
+		parts = [below]
+		if length in perms_by_length:
+			parts.append(np.asarray(perms_by_length[length]).astype(below.dtype))
+		levels[length] = unique_rows(np.concatenate(parts))
+		below = array_covers(levels[length])
+	return levels
@@ -0,0 +1,138 @@
+"""Search for statistics (or tuples of statistics) that are equidistributed
+over the permutations of a given length in several classes.
+
+Each (class, statistic tuple) pair is reduced once to a fingerprint, a hash
+of its sorted joint distribution, and classes are matched by bucketing the
+fingerprints, never by comparing distributions pairwise. The classes are
+handled one per task, optionally across a process pool, and matches are
+reported as soon as they are found.
+"""
+
+import hashlib
+import itertools
+import multiprocessing
+
+from .permutation import Permutation
+from .avclass import AvClass
+from .permclass import PermClass
+from .permarray import to_array
+from .statstable import StatsTable, resolve_statistic
+
+
+_LEVELS = {} # (basis, length) -> array of the level, kept for the life of the process.
+
+def _level_key(basis, length):
+	return (tuple(sorted(tuple(Permutation(b)) for b in basis)), length)
+
+def class_level(basis, length):
+	"""Return the array whose rows are the permutations of length `length`
+	in Av(`basis`), computing them only the first time they are asked for in
+	this process.
+
+	Notes:
+		Levels built by the workers of `find_equidistributions` are sent
+		back and cached in the parent process, so later calls send the
+		workers the cached arrays instead of building them again.
+
+	Examples:
+		>>> class_level([123], 4).shape
+		(14, 4)
+	"""
+	key = _level_key(basis, length)
+	if key not in _LEVELS:
+		_LEVELS[key] = to_array(AvClass(basis, length)[length], length)
+	return _LEVELS[key]
+
+def distribution_fingerprint(distribution):
+	"""Return a hex digest determined by the multiset described by the
+	Counter `distribution`.
+
+	Examples:
+		>>> from collections import Counter
+		>>> distribution_fingerprint(Counter([1, 2, 2])) == distribution_fingerprint(Counter([2, 1, 2]))
+		True
+	"""
+	try:
+		items = sorted(distribution.items())
+	except TypeError:
+		items = sorted(distribution.items(), key=repr)
+	return hashlib.sha1(repr(items).encode()).hexdigest()
+
+def fingerprints(table, stat_tuples):
+	"""Return the dictionary mapping each tuple of column names in
+	`stat_tuples` to the fingerprint of its joint distribution in the
+	StatsTable `table`.
+	"""
+	return {names: distribution_fingerprint(table.distribution(*names)) for names in stat_tuples}
+
+def _class_fingerprints(task):
+	"""Compute the fingerprints of one class (run in a worker process),
+	returning the level too when it had to be built from a basis.
+	"""
+	index, source, length, stats, stat_tuples = task
+	level = None
+	if isinstance(source, list):
+		source = level = class_level(source, length)
+	return index, level, fingerprints(StatsTable(source, stats), stat_tuples)
+
+def find_equidistributions(classes, stats, length=8, tuple_size=1, processes=None):
+	"""Generate the pairs of classes over whose permutations of length
+	`length` some statistic, or tuple of statistics, is equidistributed.
+
+	Notes:
+		With a process pool, the statistics are sent to the workers, so they
+		must be picklable: names of `Permutation` methods or module-level
+		functions, not lambdas.
+
+	Args:
+		classes (list): Classes, each given either by a basis (a list of
+			permutation-like objects) or as a PermClass already extended to
+			`length`.
+		stats (list): Statistics, as accepted by
+			`permpy.statstable.resolve_statistic`.
+		length (int): Length of the permutations compared.
+		tuple_size (int): Compare the joint distributions of every
+			combination of this many statistics.
+		processes (int, optional): Size of the process pool; 1 means work
+			in this process. Defaults to one process per CPU.
+
+	Yields:
+		Triples (names, i, j) with i < j, meaning the statistics `names` are
+		jointly equidistributed over `classes[i]` and `classes[j]`.
+
+	Examples:
+		>>> sorted(find_equidistributions([[123], [132], [231]], ['num_descents'], length=5, processes=1))
+		[(('num_descents',), 1, 2)]
+
+	"""
+	names = [resolve_statistic(stat)[0] for stat in stats]
+	stat_tuples = list(itertools.combinations(names, tuple_size))
+	tasks = []
+	for index, source in enumerate(classes):
+		if isinstance(source, PermClass):
+			source = to_array(source[length], length)
+		else:
+			source = [tuple(Permutation(b)) for b in source]
+			source = _LEVELS.get(_level_key(source, length), source)
+		tasks.append((index, source, length, stats, stat_tuples))
+
+	if processes == 1:
+		results = map(_class_fingerprints, tasks)
+		pool = None
+	else:
+		pool = multiprocessing.Pool(processes)
+		results = pool.imap_unordered(_class_fingerprints, tasks)
+
+	buckets = {names: {} for names in stat_tuples}
+	try:
+		for index, level, digests in results:
+			if level is not None:
+				_LEVELS.setdefault(_level_key(classes[index], length), level)
+			for names, digest in digests.items():
+				bucket = buckets[names].setdefault(digest, [])
+				for other in bucket:
+					yield (names, min(index, other), max(index, other))
+				bucket.append(index)
+	finally:
+		if pool is not None:
+			pool.terminate()
@@ -0,0 +1,100 @@
+"""Statistics that can be updated as a permutation is right-extended, so
+that classes can be enumerated by statistic without keeping their levels.
+"""
+
+class IncrementalStatistic:
+	"""A statistic computed along right-extensions.
+
+	Notes:
+		The state of the empty permutation is `initial`. When `child` is a
+		right-extension of a permutation whose state is `state`, the state of
+		`child` is `update(state, child)`; that of the permutation 1 is
+		`update(initial, Permutation(1))`. The statistic itself is
+		`value(state)`, which defaults to the state.
+
+	Args:
+		name (str): Name of the statistic.
+		initial: State of the empty permutation.
+		update (func): Function (state, child) -> state of `child`.
+		value (func, optional): Function state -> value of the statistic.
+
+	Examples:
+		>>> from permpy import Permutation
+		>>> last = IncrementalStatistic('last_value', None, lambda state, child: child[-1])
+		>>> last.value(last.update(last.initial, Permutation(132)))
+		1
+
+	"""
+
+	def __init__(self, name, initial, update, value=None):
+		self.name = name
+		self.initial = initial
+		self.update = update
+		self.value = value if value is not None else (lambda state: state)
+
+	def __repr__(self):
+		return f"IncrementalStatistic({self.name!r})"
+
+def _descents(count, child):
+	return count + (len(child) > 1 and child[-2] > child[-1])
+
+def _ascents(count, child):
+	return count + (len(child) > 1 and child[-2] < child[-1])
+
+def _inversions(count, child):
+	# The new last entry is smaller than exactly those above it.
+	return count + len(child) - 1 - child[-1]
+
+def _noninversions(count, child):
+	return count + child[-1]
+
+def _major_index(total, child):
+	return total + (len(child) - 2 if len(child) > 1 and child[-2] > child[-1] else 0)
+
+def _peaks(count, child):
+	return count + (len(child) > 2 and child[-3] < child[-2] > child[-1])
+
+def _valleys(count, child):
+	return count + (len(child) > 2 and child[-3] > child[-2] < child[-1])
+
+def _ltr_max(count, child):
+	return count + (child[-1] == len(child) - 1)
+
+def _ltr_min(count, child):
+	return count + (child[-1] == 0)
+
+def _last_value(state, child):
+	return child[-1]
+
+def _first_value(state, child):
+	# Only the first entry moves up when it is at least the new last entry.
+	if len(child) == 1:
+		return 0
+	return state + (state >= child[-1])
+
+INCREMENTAL_STATISTICS = {stat.name: stat for stat in [
+	IncrementalStatistic('num_descents', 0, _descents),
+	IncrementalStatistic('num_ascents', 0, _ascents),
+	IncrementalStatistic('num_inversions', 0, _inversions),
+	IncrementalStatistic('num_noninversions', 0, _noninversions),
+	IncrementalStatistic('major_index', 0, _major_index),
+	IncrementalStatistic('num_peaks', 0, _peaks),
+	IncrementalStatistic('num_valleys', 0, _valleys),
+	IncrementalStatistic('num_ltr_max', 0, _ltr_max),
+	IncrementalStatistic('num_ltr_min', 0, _ltr_min),
+	IncrementalStatistic('last_value', None, _last_value),
+	IncrementalStatistic('first_value', None, _first_value),
+]}
+
+def resolve_incremental(stat):
+	"""Return `stat` if it is an IncrementalStatistic, and otherwise the
+	built-in one with that name (see `INCREMENTAL_STATISTICS`).
+
+	Raises:
+		ValueError if there is no built-in statistic with that name.
+	"""
+	if isinstance(stat, IncrementalStatistic):
+		return stat
+	if stat not in INCREMENTAL_STATISTICS:
+		raise ValueError(f"{stat!r} is not an incremental statistic; choose from {sorted(INCREMENTAL_STATISTICS)} or build an IncrementalStatistic.")
+	return INCREMENTAL_STATISTICS[stat]
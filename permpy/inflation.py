@@ -0,0 +1,182 @@
+"""Enumeration of permutation classes by inflating simple permutations.
+
+Every permutation is uniquely one of: the permutation 1, an inflation
+sigma[alpha_1, ..., alpha_k] of a simple permutation sigma of length at
+least 4, a sum alpha + beta whose first component is sum indecomposable, or a
+skew sum alpha - beta whose first component is skew indecomposable. Counting
+and generating along this decomposition avoids duplicates without ever
+comparing permutations.
+"""
+
+import itertools
+
+from .permutation import Permutation
+from .permset import PermSet
+from .permclass import PermClass
+
+
+class InflationEnumerator:
+	"""Count and generate the permutations built from a set of simple
+	permutations.
+
+	Notes:
+		The permutations enumerated are those of the form 1, sigma[alpha_1,
+		..., alpha_k] with sigma one of the simples of length at least 4 and
+		each alpha_i in `components`, alpha + beta (only if 12 is one of the
+		simples), and alpha - beta (only if 21 is one of the simples), where
+		alpha and beta are themselves enumerated. When `components` is None,
+		the components are the enumerated permutations as well, so that the
+		result is the substitution closure of the simples. In particular, an
+		avoidance class whose basis consists of simple permutations is the
+		substitution closure of its own simples.
+
+		Counts and members are memoized by length, so asking for a longer
+		length only computes the new lengths.
+
+	Args:
+		simples (iterable or callable): The simple permutations, or a
+			function taking a length `n` and returning the simple permutations
+			of length `n`, such as `AvClass.simples`.
+		components (PermClass, optional): Class whose `n`th entry is the set
+			of allowed components of length `n`. An AvClass is extended as
+			needed.
+
+	Examples:
+		>>> from permpy import AvClass
+		>>> E = InflationEnumerator([12, 21])
+		>>> [E.count(n) for n in range(1, 9)]
+		[1, 2, 6, 22, 90, 394, 1806, 8558]
+		>>> E = InflationEnumerator(AvClass([2413]).simples)
+		>>> [E.count(n) for n in range(1, 9)]
+		[1, 2, 6, 23, 103, 512, 2740, 15485]
+		>>> sorted(InflationEnumerator([2413], components=AvClass([21])).generate(5))
+		[2 3 5 1 4, 2 4 5 1 3, 2 5 1 3 4, 3 5 1 2 4]
+
+	"""
+
+	def __init__(self, simples, components=None):
+		if callable(simples):
+			self._simples_of_length = simples
+		else:
+			by_length = {}
+			for sigma in simples:
+				sigma = Permutation(sigma)
+				by_length.setdefault(len(sigma), []).append(sigma)
+			self._simples_of_length = lambda n: by_length.get(n, [])
+
+		self.components = components
+		self._simples = [None]
+		self.has_sums = Permutation(12) in self.simples(2)
+		self.has_skews = Permutation(21) in self.simples(2)
+
+		# _counts[kind][n] for kind in 'prime', 'sum', 'skew'; and
+		# _powers[k][n], the number of ways to choose k components of total
+		# length n.
+		self._counts = {'prime': [0], 'sum': [0], 'skew': [0]}
+		self._totals = [0]
+		self._powers = [[1], [0]]
+		self._members = {'prime': [[]], 'sum': [[]], 'skew': [[]]}
+
+	def simples(self, n):
+		"""Return the list of simples of length `n`."""
+		while len(self._simples) <= n:
+			self._simples.append(list(self._simples_of_length(len(self._simples))))
+		return self._simples[n]
+
+	def _component_count(self, n):
+		if self.components is None:
+			return self._totals[n]
+		return len(self._component_set(n))
+
+	def _component_set(self, n):
+		if self.components is None:
+			return self.members(n)
+		if len(self.components) <= n and hasattr(self.components, 'extend_to_length'):
+			self.components.extend_to_length(n)
+		return self.components[n] if n < len(self.components) else PermSet()
+
+	def _count_next(self):
+		"""Compute the counts for the next length."""
+		n = len(self._totals)
+		powers = self._powers
+		powers[1].append(0)
+		for k in range(2, n+1):
+			if k == len(powers):
+				powers.append([0]*n)
+			powers[k].append(sum(self._component_count(j) * powers[k-1][n-j] for j in range(1, n-k+2)))
+
+		prime = int(n == 1) + sum(len(self.simples(k)) * powers[k][n] for k in range(4, n+1))
+		sums = skews = 0
+		if self.has_sums:
+			sums = sum(self._indecomposables('sum', j) * self._totals[n-j] for j in range(1, n))
+		if self.has_skews:
+			skews = sum(self._indecomposables('skew', j) * self._totals[n-j] for j in range(1, n))
+
+		self._counts['prime'].append(prime)
+		self._counts['sum'].append(sums)
+		self._counts['skew'].append(skews)
+		self._totals.append(prime + sums + skews)
+		powers[1][n] = self._component_count(n)
+
+	def _indecomposables(self, kind, n):
+		"""Return the number of enumerated permutations of length `n` that
+		are not of the given kind ('sum' or 'skew').
+		"""
+		return self._totals[n] - self._counts[kind][n]
+
+	def count(self, n):
+		"""Return the number of enumerated permutations of length `n`."""
+		while len(self._totals) <= n:
+			self._count_next()
+		return self._totals[n]
+
+	def counts(self, n):
+		"""Return the list of the numbers of enumerated permutations of each
+		length from 0 to `n`.
+		"""
+		self.count(n)
+		return self._totals[:n+1]
+
+	def _members_next(self):
+		"""Build the lists of members of the next length."""
+		n = len(self._members['prime'])
+		prime = [Permutation(0)] if n == 1 else []
+		pool = [None] + [list(self._component_set(length)) for length in range(1, n-2)]
+		for k in range(4, n+1):
+			for sigma in self.simples(k):
+				for cuts in itertools.combinations(range(1, n), k-1):
+					lengths = [stop - start for start, stop in zip((0,) + cuts, cuts + (n,))]
+					choices = [pool[length] for length in lengths]
+					for components in itertools.product(*choices):
+						prime.append(sigma.inflate(components))
+		sums = []
+		skews = []
+		for j in range(1, n):
+			lasts = self.members(n-j)
+			if self.has_sums:
+				firsts = self._members['prime'][j] + self._members['skew'][j]
+				sums.extend(first + last for first in firsts for last in lasts)
+			if self.has_skews:
+				firsts = self._members['prime'][j] + self._members['sum'][j]
+				skews.extend(first - last for first in firsts for last in lasts)
+		self._members['prime'].append(prime)
+		self._members['sum'].append(sums)
+		self._members['skew'].append(skews)
+
+	def members(self, n):
+		"""Return the list of enumerated permutations of length `n`."""
+		while len(self._members['prime']) <= n:
+			self._members_next()
+		return self._members['prime'][n] + self._members['sum'][n] + self._members['skew'][n]
+
+	def generate(self, n):
+		"""Generate the enumerated permutations of length `n`, without
+		duplicates.
+		"""
+		yield from self.members(n)
+
+	def to_class(self, length):
+		"""Return the PermClass of enumerated permutations of each length up
+		to `length`.
+		"""
+		return PermClass([PermSet(Permutation())] + [PermSet(self.members(n)) for n in range(1, length+1)])
@@ -4,9 +4,10 @@ from __future__ import print_function
 from permpy import *
 from math import factorial
 import itertools
-from collections import Counter
+from collections import Counter, defaultdict
 
 from permpy.RestrictedContainer import *
+from permpy.equidistribution import find_equidistributions
 
 def expected_basis(B):
   return PermSet([expected_basis_element(P) for P in B]).minimal_elements()
@@ -196,62 +197,9 @@ def check_nc_pattern_list(word_pairs, patterns):
   return d
 
 
-# implements rsk:
-class Tab(object):
-  def __init__(self,P,Q):
-    self.P = P
-    self.Q = Q
-
-  def __repr__(self):
-    l = len(self.P[0])
-    h = len(self.P)
-    sP = 'P = |'
-    sQ = 'Q = |'
-    for i in range(h):
-      for j in range(len(self.P[i])):
-        sP += ('%2i' %   self.P[i][j]) + '|'
-        sQ += ('%2i' %   self.Q[i][j]) + '|'
-      sP +=   '\n    |'
-      sQ +=   '\n    |'
-    return sP[:-6] +'\n'+ sQ[:-6]
-
-def rsk(perm):
-  p = [i + 1 for i in perm[::-1]]
-  q = 1
-  P = [[]]
-  Q = [[]]
-  def insert(k,r,q1):
-    if len(P) < r+1:
-      P.append([])
-      Q.append([])
-    if not P[r] or k > P[r][-1]:
-      P[r].append(k)
-      Q[r].append(q1)
-    else:
-      n = len(P[r])
-      i = n-1
-      while True:
-        b = P[r][i]
-        if k < b:
-          if i >0:
-            i -=1
-          else:
-            P[r][0] = k
-            break
-        if k > b:
-          b = P[r][i+1]
-          P[r][i+1] = k
-          break
-      insert(b,r+1,q)
-  for i in range(len(perm)-1,-1,-1):
-    insert(p.pop(),0,q)
-    q+=1
-  return Tab(P,Q)
-  
-def rsk_shape(perm):
-	P = rsk(perm).P
-	return([len(P[i]) for i in range(0,len(P))])
-	
+# rsk lives in permpy.rsk; imported here for old scripts.
+from permpy.rsk import Tab, rsk, rsk_shape
+
 def shape_contains(A,B):
 	return (len(A) >= len(B) 
 		and all(b <= a for a, b in zip(A,B)))
@@ -447,31 +395,28 @@ def check_stats(L1, L2, l=8, add_syms=False, tups=1):
     # ('size_LR_max_contig_blocks', size_LR_max_contig_blocks),
   ]
 
+  # The statistics here are lambdas, so the search runs in this process.
   C1 = [Av(B,l) for B in L1]
   C2 = [Av(B,l) for B in L2]
+  equivs = defaultdict(list)
+  for names, x, y in find_equidistributions(C1 + C2, stats, length=l, tuple_size=tups, processes=1):
+    if x < len(C1) <= y:
+      equivs[names].append((x, y - len(C1)))
 
   print("")
-  if tups == 1:
-    for (name, f) in stats:
-      equivs = check_stat(f, C1, C2, l)
-      print(name,":")
-      if len(equivs) == 0:
-        print("\tnone\n")
-        continue
-      for (x, y) in equivs:
-        print("\t",L1[x],"~",L2[y])
+  for stat_set in itertools.combinations([name for (name, f) in stats], tups):
+    if tups == 1:
+      print(stat_set[0],":")
+    else:
       print("")
-  else:
-    fs = itertools.combinations(stats, tups)
-    for stat_set in fs:
-      equivs = check_stat_list([stat_set[i][1] for i in range(len(stat_set))], C1, C2, l)
+      print('[',(' / '.join(stat_set)),']')
+    if len(equivs[stat_set]) == 0:
+      print("\tnone\n")
+      continue
+    for (x, y) in sorted(equivs[stat_set]):
+      print("\t",L1[x],"~",L2[y])
+    if tups == 1:
       print("")
-      print('[',(' / '.join([stat_set[i][0] for i in range(len(stat_set))])),']')
-      if len(equivs) == 0:
-        print("\tnone\n")
-        continue
-      for (x, y) in equivs:
-        print("\t",L1[x],"~",L2[y])
 
 def kill_syms(bases):
   if len(bases) == 0:
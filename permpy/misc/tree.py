@@ -1,3 +1,7 @@
+from collections import Counter
+
+from permpy.binarytree import DecreasingTree, decreasing_tree
+
 class Node(object):
 	"""A class for nodes of binary plane trees.
 	"""
@@ -7,56 +11,71 @@ class Node(object):
 		self.right_child = None
 
 	def __len__(self):
-		length = 1
-		if self.left_child:
-			length += len(self.left_child)
-		if self.right_child:
-			length += len(self.right_child)
-		return length
+		return sum(1 for _ in self.nodes())
+
+	def nodes(self):
+		"""Generate the nodes of the tree rooted at self, in preorder."""
+		stack = [self]
+		while stack:
+			node = stack.pop()
+			yield node
+			if node.right_child is not None:
+				stack.append(node.right_child)
+			if node.left_child is not None:
+				stack.append(node.left_child)
+
+	def array_tree(self):
+		"""Return the tree rooted at self in the array form of
+		`permpy.binarytree.DecreasingTree`, with the nodes numbered in
+		preorder.
+		"""
+		nodes = list(self.nodes())
+		index = {id(node): idx for idx, node in enumerate(nodes)}
+		parent = [-1]*len(nodes)
+		left = [-1]*len(nodes)
+		right = [-1]*len(nodes)
+		for idx, node in enumerate(nodes):
+			for children, child in ((left, node.left_child), (right, node.right_child)):
+				if child is not None:
+					children[idx] = index[id(child)]
+					parent[index[id(child)]] = idx
+		return DecreasingTree(tuple(node.label for node in nodes), parent, left, right, 0)
+
+	def levels(self):
+		"""Return the list of the depths of the nodes, in preorder, with self
+		at depth 1.
+		"""
+		return self.array_tree().depths()
 
 	def __repr__(self, width=None):
-		label = str(self.label)
-
-		if width:
-			s = r"{:" + str(width) + r"s}"
-			label = s.format(label)
-		else: 
-			width = len(label)
-
-
-		lines = [label]
-
-		if self.right_child:
-			right_repr = self.right_child.__repr__(width=width)
-			right_lines = right_repr.split("\n")
-			for idx, right_line in enumerate(right_lines):
-				try:
-					lines[idx] += " - " + right_line
-				except IndexError:
-					lines.append(" "*(width+3))
-		
-		if self.left_child:
-			# seen = len(lines)
-			left_repr = self.left_child.__repr__(width=width)
-			left_lines = left_repr.split("\n")
-			for idx, left_line in enumerate(left_lines):
-				if idx == 0:
-					lines.append(" "*(width) + r" \ " + left_line)
-				else:
-					lines.append(" "*(width+3) + left_line)
-
-		return "\n".join(lines)
+		# Render the subtrees bottom up (children follow their parents in
+		# preorder), so deep trees do not recurse.
+		if not width:
+			width = len(str(self.label))
+		nodes = list(self.nodes())
+		rendered = {}
+		for node in reversed(nodes):
+			lines = ["{:{}s}".format(str(node.label), width)]
+			if node.right_child is not None:
+				for idx, right_line in enumerate(rendered.pop(id(node.right_child))):
+					try:
+						lines[idx] += " - " + right_line
+					except IndexError:
+						lines.append(" "*(width+3))
+			if node.left_child is not None:
+				for idx, left_line in enumerate(rendered.pop(id(node.left_child))):
+					if idx == 0:
+						lines.append(" "*(width) + r" \ " + left_line)
+					else:
+						lines.append(" "*(width+3) + left_line)
+			rendered[id(node)] = lines
+		return "\n".join(rendered[id(self)])
 
 	def width(self):
-		raise NotImplementedError
+		return self.array_tree().width()
 
 	def depth(self):
-		depth_below = 0
-		if self.left_child: 
-			depth_below = max(depth_below, self.left_child.depth())
-		if self.right_child: 
-			depth_below = max(depth_below, self.right_child.depth())
-		return depth_below + 1
+		return self.array_tree().depth()
 
 	def add_left(self, child):
 		self.left_child = child
@@ -65,37 +84,26 @@ class Node(object):
 		self.right_child = child
 
 	def has_children(self):
-		return (self.left_child or self.right_child)
+		return self.left_child is not None or self.right_child is not None
 
 	def postorder(self):
-		reading = []
-		if self.left_child:
-			reading += self.left_child.postorder()
-		if self.right_child:
-			reading += self.right_child.postorder()
-		reading.append(self.label)
-		return reading
+		return self.array_tree().postorder()
 
 def create_tree(p):
 	"""Given a nonempty permutation `p`, return the associated decreasing binary plane tree.
-	"""
-	L = list(p)
-
-	max_val = max(p)
-	max_idx = p.index(max_val)
 
-	before = L[:max_idx]
-	# print(f"before={before}")
-	after  = L[max_idx+1:]
-	# print(f"after={after}")
-
-	T = Node(max_val)
-	if len(before):
-		T.add_left(create_tree(before))
-	if len(after): 
-		T.add_right(create_tree(after))
-
-	return T
+	Notes:
+		The tree is built in O(n) time by `permpy.binarytree.decreasing_tree`,
+		which gives the array form that should be preferred for large inputs.
+	"""
+	tree = decreasing_tree(p)
+	nodes = [Node(val) for val in tree.labels]
+	for idx, node in enumerate(nodes):
+		if tree.left[idx] >= 0:
+			node.add_left(nodes[tree.left[idx]])
+		if tree.right[idx] >= 0:
+			node.add_right(nodes[tree.right[idx]])
+	return nodes[tree.root]
 
 if __name__ == "__main__":
 	p = [1,3,2,7,6,5,4]
@@ -0,0 +1,287 @@
+"""Monte Carlo estimation of the distributions of statistics of uniformly
+random permutations.
+
+Permutations are drawn in batches, as rows of NumPy arrays, and their
+statistics are computed by the kernels of `permpy.batchstats`. The samples
+are split into tasks of fixed size, each with its own child of a
+`np.random.SeedSequence`, so the results depend only on the seed and not on
+how the tasks are spread over a process pool. Each task reduces its
+statistics to a count, mean and sum of squared deviations (and optionally
+a histogram), and these are merged with the pairwise update of Chan,
+Golub and LeVeque.
+"""
+
+import multiprocessing
+from collections import Counter
+
+import numpy as np
+
+from .permarray import array_dtype
+from .batchstats import KERNELS
+
+
+def random_permutations(n, count, rng=None):
+	"""Return a (count, n) array of independent uniformly random
+	permutations of length n.
+
+	Args:
+		n (int): Length of the permutations.
+		count (int): Number of permutations.
+		rng (np.random.Generator or int, optional): Source of randomness, or
+			a seed for one.
+
+	Examples:
+		>>> perms = random_permutations(5, 3, rng=0)
+		>>> perms.shape, sorted(perms[0].tolist())
+		((3, 5), [0, 1, 2, 3, 4])
+	"""
+	rng = np.random.default_rng(rng)
+	return rng.permuted(np.tile(np.arange(n, dtype=array_dtype(n)), (count, 1)), axis=1)
+
+class RunningMoments:
+	"""The count, mean and sum of squared deviations from the mean of a
+	stream of values, updated one batch at a time.
+
+	Examples:
+		>>> M = RunningMoments()
+		>>> M.update(np.array([1, 2, 3]))
+		>>> M.update(np.array([4]))
+		>>> M.count, M.mean, round(M.variance, 6)
+		(4, 2.5, 1.666667)
+	"""
+
+	def __init__(self, count=0, mean=0.0, m2=0.0):
+		self.count = count
+		self.mean = mean
+		self.m2 = m2
+
+	def __repr__(self):
+		return f"RunningMoments(count={self.count}, mean={self.mean}, variance={self.variance})"
+
+	def update(self, values):
+		"""Add the values in the array `values`."""
+		values = np.asarray(values, dtype=np.float64)
+		if not len(values):
+			return
+		mean = values.mean()
+		self.merge(RunningMoments(len(values), float(mean), float(((values - mean)**2).sum())))
+
+	def merge(self, other):
+		"""Add the values summarized by the RunningMoments `other`."""
+		if not other.count:
+			return
+		count = self.count + other.count
+		delta = other.mean - self.mean
+		self.mean += delta * other.count / count
+		self.m2 += other.m2 + delta**2 * self.count * other.count / count
+		self.count = count
+
+	@property
+	def variance(self):
+		"""The sample variance (with denominator count - 1)."""
+		return self.m2 / (self.count - 1) if self.count > 1 else float('nan')
+
+	@property
+	def std(self):
+		return self.variance ** 0.5
+
+def _resolve_kernel(stat):
+	"""Return the pair (name, kernel) described by `stat`, which is the name
+	of a kernel in `permpy.batchstats.KERNELS`, a pair (name, kernel), or a
+	function taking an array of permutations.
+	"""
+	if isinstance(stat, tuple):
+		return stat
+	if isinstance(stat, str):
+		if stat not in KERNELS:
+			raise ValueError(f"{stat!r} has no batch kernel; choose from {sorted(KERNELS)} or pass a function of an array of permutations.")
+		return stat, KERNELS[stat]
+	return stat.__name__, stat
+
+def _bin(values, width):
+	"""Return `values` rounded down to multiples of `width` (if any)."""
+	if width is None:
+		return values
+	return values // width * width
+
+def _merge_counts(counts, other, max_bins):
+	"""Add the Counter `other` to `counts`, returning None (no histogram)
+	if either is None or the result has more than `max_bins` keys.
+	"""
+	if counts is None or other is None:
+		return None
+	counts.update(other)
+	if max_bins is not None and len(counts) > max_bins:
+		return None
+	return counts
+
+def _sample_task(task):
+	"""Draw and summarize the samples of one task (run in a worker process)."""
+	n, seed, samples, batch_size, stats, histograms, bin_widths, max_bins = task
+	rng = np.random.default_rng(seed)
+	kernels = [_resolve_kernel(stat) for stat in stats]
+	moments = {name: RunningMoments() for name, _ in kernels}
+	counts = {name: Counter() for name, _ in kernels}
+	while samples > 0:
+		perms = random_permutations(n, min(batch_size, samples), rng)
+		samples -= perms.shape[0]
+		for name, kernel in kernels:
+			values = np.asarray(kernel(perms))
+			moments[name].update(values)
+			if histograms and counts[name] is not None:
+				distinct, multiplicities = np.unique(_bin(values, bin_widths.get(name)), return_counts=True)
+				counts[name] = _merge_counts(counts[name], dict(zip(distinct.tolist(), multiplicities.tolist())), max_bins)
+	return moments, counts
+
+class MonteCarlo:
+	"""Estimates of the distributions of statistics of uniformly random
+	permutations of length `n`, built up by `run` or `iter_run`.
+
+	Notes:
+		Statistics are run on whole batches, so with a process pool they are
+		sent to the workers and must be picklable: kernel names, or
+		module-level functions of an array of permutations.
+
+	Args:
+		n (int): Length of the permutations.
+		stats (list): Statistics, each the name of a kernel in
+			`permpy.batchstats.KERNELS`, a pair (name, function), or a
+			function taking an (N, n) array and returning N values.
+		seed (int, optional): Seed of the root `np.random.SeedSequence`.
+		batch_size (int, optional): Number of permutations drawn at once.
+			Defaults to about 2^22 entries' worth.
+		task_size (int, optional): Number of samples per task. Defaults to
+			eight batches.
+		histograms (bool): Whether to keep the distribution of each
+			statistic, as a Counter.
+		bin_widths (dict, optional): Maps statistics to bin widths; the
+			histogram of such a statistic counts the values v in bins keyed
+			by v // width * width rather than the exact values.
+		max_bins (int, optional): Most keys kept in the histogram of a
+			statistic. A histogram that would need more is dropped and only
+			the moments of that statistic are kept; give it a bin width to
+			keep a histogram. None means no limit.
+
+	Examples:
+		>>> M = MonteCarlo(10, ['num_descents', 'num_inversions'], seed=1)
+		>>> M.run(20000).count
+		20000
+		>>> abs(M.mean('num_descents') - 4.5) < 0.05
+		True
+		>>> abs(M.variance('num_inversions') - 10*9*25/72) < 1
+		True
+
+		Orders of long permutations exceed 64 bits, and are kept exactly:
+
+		>>> from permpy import Permutation
+		>>> M = MonteCarlo(10**5, ['order'], seed=2, batch_size=5).run(10)
+		>>> rng = np.random.default_rng(np.random.SeedSequence(2).spawn(1)[0])
+		>>> perms = np.concatenate([random_permutations(10**5, 5, rng) for _ in range(2)])
+		>>> exact = Counter(Permutation(row, clean=True).order() for row in perms.tolist())
+		>>> M.counts['order'] == exact, max(exact) > 2**63
+		(True, True)
+
+	"""
+
+	def __init__(self, n, stats, seed=None, batch_size=None, task_size=None, histograms=True, bin_widths=None, max_bins=2**16):
+		self.n = n
+		self.stats = list(stats)
+		self.names = [_resolve_kernel(stat)[0] for stat in self.stats]
+		self.seed = np.random.SeedSequence(seed)
+		self.batch_size = batch_size or max(1, 2**22 // max(n, 1))
+		self.task_size = task_size or 8*self.batch_size
+		self.histograms = histograms
+		self.bin_widths = dict(bin_widths or {})
+		self.max_bins = max_bins
+		self.moments = {name: RunningMoments() for name in self.names}
+		self.counts = {name: Counter() for name in self.names}
+		self.count = 0
+
+	def __repr__(self):
+		return f"MonteCarlo over {self.count} permutations of length {self.n} with statistics {self.names}"
+
+	def iter_run(self, samples, processes=1):
+		"""Draw `samples` more permutations, yielding self after the results
+		of each task are merged in, so that running estimates can be
+		reported.
+
+		Args:
+			samples (int): Number of permutations to draw.
+			processes (int, optional): Size of the process pool; 1 means work
+				in this process, and None means one process per CPU.
+		"""
+		sizes = [self.task_size] * (samples // self.task_size)
+		if samples % self.task_size:
+			sizes.append(samples % self.task_size)
+		seeds = self.seed.spawn(len(sizes))
+		tasks = [(self.n, seed, size, self.batch_size, self.stats, self.histograms, self.bin_widths, self.max_bins)
+			for seed, size in zip(seeds, sizes)]
+
+		if processes == 1:
+			results = map(_sample_task, tasks)
+			pool = None
+		else:
+			pool = multiprocessing.Pool(processes)
+			results = pool.imap(_sample_task, tasks)
+
+		try:
+			for size, (moments, counts) in zip(sizes, results):
+				for name in self.names:
+					self.moments[name].merge(moments[name])
+					self.counts[name] = _merge_counts(self.counts[name], counts[name], self.max_bins)
+				self.count += size
+				yield self
+		finally:
+			if pool is not None:
+				pool.terminate()
+
+	def run(self, samples, processes=1):
+		"""Draw `samples` more permutations (see `iter_run`) and return self."""
+		for _ in self.iter_run(samples, processes):
+			pass
+		return self
+
+	def mean(self, name):
+		return self.moments[name].mean
+
+	def variance(self, name):
+		return self.moments[name].variance
+
+	def histogram(self, name):
+		"""Return the arrays (values, counts) of the sorted distinct values
+		seen for the statistic `name` and their multiplicities.
+
+		Examples:
+			>>> M = MonteCarlo(4, ['num_fixed_points'], seed=0).run(1000)
+			>>> values, counts = M.histogram('num_fixed_points')
+			>>> values.tolist(), int(counts.sum())
+			([0, 1, 2, 4], 1000)
+
+			Statistics with many values can be binned:
+
+			>>> M = MonteCarlo(100, ['num_inversions'], seed=0, bin_widths={'num_inversions': 500}, max_bins=20).run(1000)
+			>>> M.histogram('num_inversions')[0].tolist()
+			[1500, 2000, 2500]
+		"""
+		counts = self._counts(name)
+		values = sorted(counts)
+		return np.array(values), np.array([counts[value] for value in values])
+
+	def distribution(self, name):
+		"""Return the empirical distribution of the statistic `name`, as a
+		dictionary from values to frequencies.
+		"""
+		return {value: count / self.count for value, count in sorted(self._counts(name).items())}
+
+	def _counts(self, name):
+		if not self.histograms:
+			raise ValueError("No histograms were kept; pass histograms=True.")
+		if self.counts[name] is None:
+			raise ValueError(f"The histogram of {name!r} passed max_bins={self.max_bins} and was dropped; give it a bin width.")
+		return self.counts[name]
+
+	def summary(self):
+		"""Return a dictionary mapping each statistic to its (mean,
+		variance).
+		"""
+		return {name: (self.mean(name), self.variance(name)) for name in self.names}
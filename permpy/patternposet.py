@@ -0,0 +1,309 @@
+"""The Möbius function of the pattern poset of permutations.
+
+The interval [σ, π] is read off the downset of π (see `permpy.downset`),
+whose members are kept as packed integers. The members are numbered in
+order of decreasing length, and each one records as a bitset (a Python int)
+the members above it, so that
+
+	μ(τ, π) = -Σ μ(ρ, π)  over  τ < ρ ≤ π
+
+is one pass over the bits of τ's upset. The values μ(·, π) computed for one
+σ are kept and reused by later calls with the same π, and since μ is
+invariant under the eight symmetries of the square, every pair (σ, π) is
+first moved to the one whose π is lexicographically least.
+"""
+
+import multiprocessing
+from functools import lru_cache
+
+from .permutation import Permutation
+from .downset import field_bits, pack, unpack, iter_packed_downset, _delete_all
+
+
+_SYMMETRIES = [(), ('reverse',), ('complement',), ('inverse',),
+	('reverse', 'complement'), ('reverse', 'inverse'), ('complement', 'inverse'),
+	('reverse', 'complement', 'inverse')]
+
+def _apply(p, ops):
+	for op in ops:
+		p = getattr(p, op)()
+	return p
+
+def _undo(p, ops):
+	for op in reversed(ops):
+		p = getattr(p, op)()
+	return p
+
+def canonical_pair(sigma, pi):
+	"""Return the image (σ', π') of the pair of permutations under the
+	symmetry of the square that makes π' lexicographically least, together
+	with that symmetry (as the sequence of methods applied).
+
+	Examples:
+		>>> canonical_pair(Permutation(21), Permutation(3412))
+		(1 2, 2 1 4 3, ('reverse',))
+	"""
+	ops = min(_SYMMETRIES, key=lambda ops: (tuple(_apply(pi, ops)), len(ops)))
+	return _apply(sigma, ops), _apply(pi, ops), ops
+
+def has_opposing_adjacencies(p):
+	"""Determine whether `p` has both an increasing bond (consecutive
+	entries i, i+1) and a decreasing one (i+1, i), in which case
+	μ(1, p) = 0.
+
+	Examples:
+		>>> has_opposing_adjacencies(Permutation(12543))
+		True
+	"""
+	steps = set(p[idx+1] - p[idx] for idx in range(len(p)-1))
+	return 1 in steps and -1 in steps
+
+def _shortcut(sigma, pi):
+	"""Return μ(σ, π) if it follows from the shape of the pair alone, and
+	None otherwise.
+	"""
+	gap = len(pi) - len(sigma)
+	if gap < 0:
+		return 0
+	if gap == 0:
+		return int(sigma == pi)
+	if not sigma:
+		return -1 if len(pi) == 1 else 0
+	if gap == 1:
+		return -1 if pi.involves(sigma) else 0
+	if pi.is_increasing() or pi.is_decreasing():
+		return 0
+	if len(sigma) == 1 and has_opposing_adjacencies(pi):
+		return 0
+	return None
+
+class PatternInterval:
+	"""The downset of `pi`, as the principal order ideal in which the Möbius
+	function μ(·, π) is evaluated.
+
+	Attributes:
+		pi (Permutation): The top element.
+		bits (int): Bits per entry of the packed members (see
+			`permpy.downset.pack`).
+		members (list): The packed members, by decreasing length.
+		lengths (list): Their lengths.
+		index (dict): Maps each pair (packed member, length) to its position
+			in `members`.
+		upsets (list): For each member, the bitset of the members above it
+			(itself included).
+		mu (dict): The values μ(member, π) computed so far, by position.
+
+	Examples:
+		>>> I = PatternInterval(Permutation(2413))
+		>>> len(I), I.mobius(Permutation(1))
+		(9, -3)
+
+	"""
+
+	def __init__(self, pi):
+		self.pi = Permutation(pi)
+		self.bits = field_bits(len(self.pi))
+		self.members = []
+		self.lengths = []
+		length = len(self.pi)
+		for level in iter_packed_downset(self.pi):
+			self.members.extend(level)
+			self.lengths.extend([length]*len(level))
+			length -= 1
+		self.index = {(x, length): idx for idx, (x, length) in enumerate(zip(self.members, self.lengths))}
+		self.upsets = [1 << idx for idx in range(len(self.members))]
+		for idx, x in enumerate(self.members):
+			if self.lengths[idx] == 0:
+				continue
+			for y in _delete_all(([(x, 0)], self.lengths[idx], self.bits)):
+				self.upsets[self.index[y, self.lengths[idx]-1]] |= self.upsets[idx]
+		self.mu = {0: 1}
+
+	def __len__(self):
+		return len(self.members)
+
+	def __repr__(self):
+		return f"PatternInterval below {self.pi} with {len(self)} members"
+
+	def permutation(self, idx):
+		"""Return the member in position `idx` as a Permutation."""
+		return Permutation(unpack(self.members[idx], self.lengths[idx], self.bits), clean=True)
+
+	def _mobius_at(self, target):
+		"""Return μ(member `target`, π), computing it (and every value it
+		depends on) from the members above it, nearest to π first.
+		"""
+		if target in self.mu:
+			return self.mu[target]
+		pending = self.upsets[target]
+		while pending:
+			low = pending & -pending
+			pending ^= low
+			idx = low.bit_length() - 1
+			if idx in self.mu:
+				continue
+			total = 0
+			above = self.upsets[idx] ^ low
+			while above:
+				bit = above & -above
+				above ^= bit
+				total += self.mu[bit.bit_length() - 1]
+			self.mu[idx] = -total
+		return self.mu[target]
+
+	def mobius(self, sigma):
+		"""Return μ(σ, π)."""
+		sigma = Permutation(sigma)
+		if len(sigma) > len(self.pi):
+			return 0
+		idx = self.index.get((pack(sigma, self.bits), len(sigma)))
+		if idx is None:
+			return 0
+		return self._mobius_at(idx)
+
+	def profile(self):
+		"""Return the dictionary mapping every permutation σ ≤ π to μ(σ, π)."""
+		for idx in range(len(self)):
+			self._mobius_at(idx)
+		return {self.permutation(idx): self.mu[idx] for idx in range(len(self))}
+
+@lru_cache(maxsize=64)
+def _interval(pi):
+	return PatternInterval(pi)
+
+def mobius(sigma, pi, cache=None):
+	"""Return the value μ(σ, π) of the Möbius function of the pattern poset.
+
+	Notes:
+		Pairs whose value follows from their shape (equal or adjacent
+		lengths, monotone π, and μ(1, π) = 0 when π has both an increasing
+		and a decreasing bond) are answered at once. Otherwise the downset of
+		the canonical π is built once per process (see `PatternInterval`) and
+		shared by all the σ asked about.
+
+	Args:
+		sigma, pi (Permutation-like objects): The bottom and top of the
+			interval.
+		cache (mapping, optional): A persistent store of results, such as
+			`shelve.open(path)`, keyed by the string form of the canonical
+			pair; it is read first and written to after computing.
+
+	Examples:
+		>>> mobius(Permutation(1), Permutation(2413))
+		-3
+		>>> mobius(Permutation(12), Permutation(3142))
+		3
+		>>> mobius(Permutation(1), Permutation(12543))
+		0
+	"""
+	sigma, pi, _ = canonical_pair(Permutation(sigma), Permutation(pi))
+	value = _shortcut(sigma, pi)
+	if value is not None:
+		return value
+	key = f"{tuple(sigma)}<{tuple(pi)}"
+	if cache is not None and key in cache:
+		return cache[key]
+	value = _interval(pi).mobius(sigma)
+	if cache is not None:
+		cache[key] = value
+	return value
+
+def mobius_profile(pi):
+	"""Return the dictionary mapping every permutation σ contained in `pi`
+	to μ(σ, π).
+
+	Examples:
+		>>> profile = mobius_profile(Permutation(231))
+		>>> [(s, profile[s]) for s in sorted(profile) if len(s)]
+		[(1, 1), (1 2, -1), (2 1, -1), (2 3 1, 1)]
+	"""
+	_, canonical, ops = canonical_pair(Permutation(), Permutation(pi))
+	return {_undo(s, ops): value for s, value in _interval(canonical).profile().items()}
+
+@lru_cache(maxsize=2**18)
+def _contains(x, length, bits, sigma):
+	"""Determine whether the packed permutation `x` of length `length`
+	contains the pattern `sigma`; cached, since the same patterns come up
+	again and again below different permutations.
+	"""
+	return Permutation(unpack(x, length, bits), clean=True).involves(sigma)
+
+def iter_interval(sigma, pi):
+	"""Generate the levels of the interval [σ, π], from π down to σ, as sets
+	of packed permutations (see `permpy.downset.pack`, with
+	`field_bits(len(pi))` bits).
+
+	Notes:
+		The levels are the downset of π, except that patterns not containing
+		σ are dropped as soon as they appear, and nothing below them is ever
+		generated.
+
+	Examples:
+		>>> [len(level) for level in iter_interval(Permutation(1), Permutation(2413))]
+		[1, 4, 2, 1]
+	"""
+	sigma = Permutation(sigma)
+	pi = Permutation(pi)
+	if len(sigma) > len(pi) or not pi.involves(sigma):
+		return
+	bits = field_bits(len(pi))
+	level = {pack(pi, bits): 0}
+	yield set(level)
+	for length in range(len(pi), len(sigma), -1):
+		children = _delete_all((list(level.items()), length, bits))
+		level = {y: idx for y, idx in children.items() if _contains(y, length-1, bits, sigma)}
+		yield set(level)
+
+def interval(sigma, pi):
+	"""Return the interval [σ, π] as a list of sets of Permutations, the ith
+	holding its members of length len(σ) + i.
+
+	Examples:
+		>>> [sorted(level) for level in interval(12, 2413)]
+		[[1 2], [1 3 2, 2 1 3, 2 3 1, 3 1 2], [2 4 1 3]]
+	"""
+	sigma = Permutation(sigma)
+	pi = Permutation(pi)
+	bits = field_bits(len(pi))
+	levels = [{Permutation(unpack(x, len(pi)-k, bits), clean=True) for x in level}
+		for k, level in enumerate(iter_interval(sigma, pi))]
+	return levels[::-1]
+
+def interval_counts(sigma, pi):
+	"""Return the list of the numbers of members of the interval [σ, π] of
+	each length from len(σ) to len(π), the coefficients of its rank
+	generating function; the list is empty if σ is not contained in π.
+
+	Examples:
+		>>> interval_counts(Permutation(1), Permutation(2413))
+		[1, 2, 4, 1]
+	"""
+	sigma, pi, _ = canonical_pair(Permutation(sigma), Permutation(pi))
+	return list(_interval_counts(sigma, pi))
+
+@lru_cache(maxsize=2**12)
+def _interval_counts(sigma, pi):
+	return tuple(len(level) for level in iter_interval(sigma, pi))[::-1]
+
+def _interval_counts_task(pair):
+	return interval_counts(*pair)
+
+def interval_counts_many(pairs, processes=None, chunksize=16):
+	"""Return the list of `interval_counts(sigma, pi)` for the pairs
+	(sigma, pi) in `pairs`, computed across a process pool.
+
+	Args:
+		pairs (iterable): Pairs of permutation-like objects.
+		processes (int, optional): Size of the pool; 1 means work in this
+			process, and None means one process per CPU.
+		chunksize (int): Number of pairs sent to a worker at once.
+
+	Examples:
+		>>> interval_counts_many([(1, 2413), (21, 321)], processes=1)
+		[[1, 2, 4, 1], [1, 1]]
+	"""
+	pairs = [(Permutation(sigma), Permutation(pi)) for sigma, pi in pairs]
+	if processes == 1:
+		return [_interval_counts_task(pair) for pair in pairs]
+	with multiprocessing.Pool(processes) as pool:
+		return pool.map(_interval_counts_task, pairs, chunksize)
@@ -0,0 +1,120 @@
+"""Conversion between collections of permutations of one length and NumPy
+arrays with one row per permutation.
+"""
+
+import itertools
+import math
+
+import numpy as np
+
+from .permutation import Permutation
+from .batchstats import rank_encoding, from_rank_encoding
+
+
+def array_dtype(n):
+	"""Return the smallest signed integer dtype holding the values 0, ...,
+	n-1 and their pairwise differences.
+	"""
+	if n <= 2**7:
+		return np.int8
+	if n <= 2**15:
+		return np.int16
+	return np.int32
+
+def to_array(perms, n=None):
+	"""Return the (N, n) array whose rows are the permutations in `perms`.
+
+	Args:
+		perms (iterable): Permutations, all of the same length.
+		n (int, optional): Their length, needed only if `perms` is empty.
+
+	Raises:
+		ValueError if the permutations do not all have the same length.
+
+	Examples:
+		>>> to_array([Permutation(231), Permutation(123)])
+		array([[1, 2, 0],
+		       [0, 1, 2]], dtype=int8)
+	"""
+	perms = list(perms)
+	if n is None:
+		n = len(perms[0]) if perms else 0
+	if any(len(p) != n for p in perms):
+		raise ValueError(f"to_array needs permutations of a single length, not {sorted(set(len(p) for p in perms))}.")
+	return np.array(perms, dtype=array_dtype(n)).reshape(len(perms), n)
+
+def from_array(array):
+	"""Return the list of Permutations given by the rows of `array`.
+
+	Examples:
+		>>> from_array(to_array([Permutation(231)]))
+		[2 3 1]
+	"""
+	return [Permutation(row, clean=True) for row in np.asarray(array).tolist()]
+
+def _factorials(n):
+	if n > 20:
+		raise ValueError(f"Lexicographic ranks of permutations of length {n} do not fit in 64 bits.")
+	return np.array([math.factorial(n-1-idx) for idx in range(n)], dtype=np.int64)
+
+def lex_ranks(perms):
+	"""Return the array of the positions of the rows of `perms` in the
+	lexicographic order of the permutations of their length (at most 20).
+
+	Examples:
+		>>> lex_ranks(np.array([[0, 1, 2], [1, 0, 2], [2, 1, 0]]))
+		array([0, 2, 5])
+	"""
+	n = perms.shape[1]
+	factorials = _factorials(n)
+	if not hasattr(np, 'bitwise_count'): # NumPy < 2.0
+		return rank_encoding(perms) @ factorials
+	# Keep the set of values seen so far as a bitmask, so that each entry of
+	# the rank encoding is the entry less the number of smaller values seen.
+	perms = perms.astype(np.int64)
+	seen = np.zeros(perms.shape[0], dtype=np.int64)
+	ranks = np.zeros(perms.shape[0], dtype=np.int64)
+	for idx in range(n):
+		bit = np.left_shift(1, perms[:, idx])
+		ranks = ranks * (n - idx) + perms[:, idx] - np.bitwise_count(seen & (bit - 1))
+		seen |= bit
+	return ranks
+
+def from_lex_ranks(ranks, n):
+	"""Return the (N, n) array of the permutations of length `n` with the
+	given lexicographic ranks; the inverse of `lex_ranks`.
+
+	Examples:
+		>>> from_lex_ranks(np.array([0, 2, 5]), 3)
+		array([[0, 1, 2],
+		       [1, 0, 2],
+		       [2, 1, 0]], dtype=int8)
+	"""
+	ranks = np.asarray(ranks, dtype=np.int64)
+	codes = np.empty((len(ranks), n), dtype=np.int64)
+	for idx, weight in enumerate(_factorials(n).tolist()):
+		codes[:, idx], ranks = np.divmod(ranks, weight)
+	return from_rank_encoding(codes).astype(array_dtype(n))
+
+def one_cycle_arrays(n, chunk_size=100000):
+	"""Generate the permutations of length `n` that consist of one cycle, in
+	the order of `Permutation.one_cycles`, as arrays of at most
+	`chunk_size` rows.
+
+	Examples:
+		>>> [chunk.tolist() for chunk in one_cycle_arrays(3)]
+		[[[1, 2, 0], [2, 0, 1]]]
+	"""
+	if n == 0:
+		return
+	dtype = array_dtype(n)
+	tails = itertools.permutations(range(n-1))
+	while True:
+		rows = list(itertools.islice(tails, chunk_size))
+		if not rows:
+			return
+		chunk = np.array(rows, dtype=dtype).reshape(len(rows), n-1)
+		cycles = np.hstack([np.full((len(chunk), 1), n-1, dtype=dtype), chunk])
+		perms = np.empty_like(cycles)
+		perms[np.arange(len(chunk))[:, None], cycles] = np.roll(cycles, -1, axis=1)
+		yield perms
@@ -5,6 +5,7 @@ from math import factorial
 
 from .permutation import Permutation
 from .permset import PermSet
+from .statstable import StatsTable
 from .deprecated.permclassdeprecated import PermClassDeprecatedMixin
 from .utils import copy_func
 
@@ -33,8 +34,8 @@ class PermClass(list,
 				return PermClass(C)
 
 			new_set = PermSet()
-			to_check = PermSet(set.union(*[p.covered_by() for p in C[length-1]]))
-			to_check = PermSet(p for p in to_check if PermSet(p.covers()).issubset(C[length-1]))
+			to_check = PermSet(q for p in C[length-1] for q in p.iter_covered_by())
+			to_check = PermSet(p for p in to_check if all(q in C[length-1] for q in p.iter_covers()))
 			
 			while to_check:
 				p = to_check.pop()
@@ -76,6 +77,18 @@ class PermClass(list,
 				if not test(p):
 					self[i].remove(p)
 
+	def stats_table(self, level, stats):
+		"""Return a StatsTable of the given statistics over the permutations
+		of length `level` in `self`.
+
+		Examples:
+			>>> from permpy import AvClass
+			>>> AvClass([132], length=5).stats_table(5, ['num_descents']).histogram('num_descents')
+			(array([0, 1, 2, 3, 4]), array([ 1, 10, 20, 10,  1]))
+
+		"""
+		return StatsTable(self[level], stats, n=level)
+
 	def guess_basis(self, max_length=6, search_mode=False):
 		"""Guess a basis for the class up to "max_length" by iteratively
 		generating the class with basis elements known so far (initially {})
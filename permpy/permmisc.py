@@ -1,49 +1,168 @@
+import itertools
 from math import gcd
 
+from .binarytree import decreasing_tree
+
 def lcm(L):
 	result = 1
 	for val in L:
 		result *= val // gcd(result, val)
 	return result
 
+def _prefix_bounds(Q):
+	"""For each entry of `Q`, find the positions of the nearest smaller and
+	nearest larger values to its left (or -1 if there are none).
+	"""
+	lower = []
+	upper = []
+	for idx, val in enumerate(Q):
+		below = [j for j in range(idx) if Q[j] < val]
+		above = [j for j in range(idx) if Q[j] > val]
+		lower.append(max(below, key=Q.__getitem__) if below else -1)
+		upper.append(min(above, key=Q.__getitem__) if above else -1)
+	return lower, upper
+
+def _standardize_values(vals, n):
+	"""Standardize the distinct values `vals`, all less than `n`, in O(n)
+	time.
+	"""
+	ranks = [0]*n
+	for val in vals:
+		ranks[val] = 1
+	rank = 0
+	for val in range(n):
+		ranks[val], rank = rank, rank + ranks[val]
+	return [ranks[val] for val in vals]
+
+def _contract(p, inc=True, dec=True):
+	"""Return the lowest values of the blocks obtained by repeatedly merging
+	adjacent blocks of `p` whose values are consecutive, increasing (if
+	`inc`) or decreasing (if `dec`).
+
+	Notes:
+		Merging is confluent, so merging on a stack as each entry arrives
+		gives the same blocks as contracting the first bond repeatedly.
+	"""
+	lows = []
+	highs = []
+	for val in p:
+		low = high = val
+		while lows and ((inc and highs[-1] + 1 == low) or (dec and high + 1 == lows[-1])):
+			low = min(low, lows.pop())
+			high = max(high, highs.pop())
+		lows.append(low)
+		highs.append(high)
+	return lows
+
+def _lis_ending(p):
+	"""For each entry of `p`, return the length of the longest increasing
+	subsequence of `p` ending with that entry, in O(n log n) time.
+	"""
+	n = len(p)
+	tree = [0]*(n+1) # Fenwick tree of prefix maxima, indexed by value + 1
+	lengths = []
+	for val in p:
+		best = 0
+		idx = val
+		while idx > 0:
+			best = max(best, tree[idx])
+			idx -= idx & -idx
+		best += 1
+		lengths.append(best)
+		idx = val + 1
+		while idx <= n:
+			tree[idx] = max(tree[idx], best)
+			idx += idx & -idx
+	return lengths
+
+def _rtlmax_ltrmin_layers(p):
+	"""For each entry of `p`, return the round in which it is removed when
+	the right-to-left maxima and left-to-right minima are peeled off
+	repeatedly (starting from round 1).
+
+	Notes:
+		An entry is peeled once everything above and to its right, or
+		everything below and to its left, is gone, so its round is the
+		shorter of the longest increasing subsequences starting and ending
+		with it.
+	"""
+	n = len(p)
+	ending = _lis_ending(p)
+	starting = _lis_ending([n-1-val for val in reversed(p)])[::-1]
+	return [min(pair) for pair in zip(ending, starting)]
+
 class PermutationMiscMixin:
 	"""Contains various functions for Permutation to inherit."""
 
 	@classmethod
 	def one_cycles(cls, n):
-		"""Generate those permutations of length n which consist of one cycle.
+		"""Generate those permutations of length n which consist of one cycle,
+		each paired with the cycle (as a list starting from n-1).
+
+		Notes:
+			See `permpy.permarray.one_cycle_arrays` to get them in NumPy
+			chunks instead.
+
+		Examples:
+			>>> [tau for tau, cycle in Permutation.one_cycles(3)]
+			[2 3 1, 3 1 2]
 		"""
+		if n == 0:
+			return
 		for pi in itertools.permutations(range(n-1)):
-			cycle = [n-1] + list(pi)
-			tau = [None for _ in range(n)]
-			for idx, val in enumerate(cycle[:-1]):
-				tau[val] = cycle[idx+1]
-			tau[cycle[-1]] = cycle[0]
-			yield (Permutation(tau), cycle)
+			cycle = (n-1,) + pi
+			tau = [0]*n
+			prev = cycle[-1]
+			for val in cycle:
+				tau[prev] = val
+				prev = val
+			yield (cls(tau, clean=True), list(cycle))
 
 	def cycle_decomp(self):
-		"""Return the cycle decomposition of the permutation. 
-		Return as a list of cycles, each of which is represented as a list.
+		"""Return the cycle decomposition of the permutation, in O(n) time.
+		Return as a list of cycles, each of which is represented as a list
+		starting from its largest entry, ordered by those entries.
 		
 		Examples:
 			>>> Permutation(53814276).cycle_decomp()
 			[[4, 3, 0], [6], [7, 5, 1, 2]]
 
 		"""
-		not_seen = set(self)
+		seen = [False]*len(self)
 		cycles = []
-		while len(not_seen) > 0:
-			a = max(not_seen)
+		for a in range(len(self)-1, -1, -1):
+			if seen[a]:
+				continue
 			cyc = [a]
-			not_seen.remove(a)
+			seen[a] = True
 			b = self[a]
-			while b in not_seen:
-				not_seen.remove(b)
+			while not seen[b]:
+				seen[b] = True
 				cyc.append(b)
 				b = self[b]
 			cycles.append(cyc)
 		return cycles[::-1]
 
+	def cycle_type(self):
+		"""Return the cycle type of the permutation, the partition (as a
+		weakly decreasing tuple) formed by the lengths of its cycles.
+
+		Examples:
+			>>> Permutation(53814276).cycle_type()
+			(4, 3, 1)
+		"""
+		seen = [False]*len(self)
+		lengths = []
+		for a in range(len(self)):
+			length = 0
+			while not seen[a]:
+				seen[a] = True
+				a = self[a]
+				length += 1
+			if length:
+				lengths.append(length)
+		return tuple(sorted(lengths, reverse=True))
+
 	def cycles(self):
 		"""Return the cycle notation representation of the permutation."""
 		stringlist = ['( ' + ' '.join([str(x+1) for x in cyc]) + ' )'
@@ -51,9 +170,30 @@ class PermutationMiscMixin:
 		return ' '.join(stringlist)
 	
 	def order(self):
-		"""Return the grou-theotric order of self."""
-		L = map(len, self.cycle_decomp())
-		return lcm(L)
+		"""Return the group-theoretic order of self."""
+		return lcm(self.cycle_type())
+
+	def decreasing_tree(self):
+		"""Return the decreasing binary plane tree of self, as a
+		`permpy.binarytree.DecreasingTree` built in O(n) time.
+
+		Examples:
+			>>> T = Permutation(2413).decreasing_tree()
+			>>> T.depth(), T.width(), T.postorder()
+			(3, 2, [1, 0, 2, 3])
+		"""
+		return decreasing_tree(self)
+
+	def stack_sort(self):
+		"""Return the image of self under West's stack-sorting map, the
+		postorder reading of its decreasing binary plane tree.
+
+		Examples:
+			>>> Permutation(2413).stack_sort()
+			2 1 3 4
+		"""
+		from .permutation import Permutation
+		return Permutation(decreasing_tree(self).postorder(), clean=True)
 
 	def children(self):
 		"""Return all patterns contained in self of length one less than the permutation."""
@@ -74,8 +214,15 @@ class PermutationMiscMixin:
 		return S
 
 	def sum_indecomposable_sequence(self):
+		"""Return the list of the numbers of sum indecomposable patterns of
+		self of each length from 1 to len(self).
+
+		Examples:
+			>>> Permutation(2413).sum_indecomposable_sequence()
+			[1, 1, 2, 1]
+		"""
 		S = self.downset()
-		return [len([p for p in S if len(p)==i and not p.sum_decomposable()]) for i in range(1,max([len(p) for p in S])+1)]
+		return [sum(1 for p in S[i] if not p.sum_decomposable()) for i in range(1, len(self)+1)]
 
 	def sum_indec_bdd_by(self, n):
 		l = [1]
@@ -88,76 +235,199 @@ class PermutationMiscMixin:
 		return True
 
 	def contains_locations(self, Q):
-		locs = []
-		sublocs = itertools.combinations(range(len(self)), len(Q))
-		for subloc in sublocs:
-			if Permutation([self[i] for i in subloc]) == Q:
-				locs.append(subloc)
+		"""Return the list of (index tuples of) occurrences of `Q` in `self`.
 
-		return locs
+		Examples:
+			>>> Permutation(4132).contains_locations(Permutation(21))
+			[(0, 1), (0, 2), (0, 3), (2, 3)]
+		"""
+		return list(self.iter_locations(Q))
 
-	def rank_val(self, i):
-		return len([j for j in range(i+1,len(self)) if self[j] < self[i]])
+	def iter_locations(self, Q, limit=None):
+		"""Generate the (index tuples of) occurrences of the pattern `Q` in
+		`self`, in lexicographic order.
 
-	def rank_encoding(self):
-		return [self.rank_val(i) for i in range(len(self))]
+		Notes:
+			Occurrences are built one entry at a time, and a partial occurrence
+			is abandoned as soon as it is no longer order-isomorphic to the
+			corresponding prefix of `Q`, so no complete subsets are filtered.
 
-	def num_rtlmax_ltrmin_layers(self):
-		return len(self.rtlmax_ltrmin_decomposition())
+		Args:
+			Q (Permutation-like object): the pattern to look for.
+			limit (int, optional): stop after this many occurrences.
 
-	def rtlmax_ltrmin_decomposition(self):
-		P = Permutation(self)
-		num_layers = 0
-		layers = []
-		while len(P) > 0:
-			num_layers += 1
-			positions = sorted(list(set(P.rtlmax()+P.ltrmin())))
-			layers.append(positions)
-			P = Permutation([P[i] for i in range(len(P)) if i not in positions])
-		return layers
+		Examples:
+			>>> list(Permutation(35142).iter_locations(231))
+			[(0, 1, 2), (0, 1, 4), (0, 3, 4)]
+			>>> list(Permutation(35142).iter_locations(231, limit=1))
+			[(0, 1, 2)]
+		"""
+		from .permutation import Permutation
+		Q = Permutation(Q)
+
+		n = len(self)
+		k = len(Q)
+		if k > n or limit == 0:
+			return
+		if k == 0:
+			yield ()
+			return
+
+		lower, upper = _prefix_bounds(Q)
+		locs = [-1]*k
+		found = 0
+		depth = 0
+		while depth >= 0:
+			# The entry placed at `depth` must lie strictly between the entries
+			# already placed at `lower[depth]` and `upper[depth]`.
+			low = self[locs[lower[depth]]] if lower[depth] != -1 else -1
+			high = self[locs[upper[depth]]] if upper[depth] != -1 else n
+			last = n - k + depth
+			idx = locs[depth] + 1
+			while idx <= last and not low < self[idx] < high:
+				idx += 1
+			if idx > last:
+				depth -= 1
+				continue
+
+			locs[depth] = idx
+			if depth == k-1:
+				yield tuple(locs)
+				found += 1
+				if found == limit:
+					return
+			else:
+				depth += 1
+				locs[depth] = idx
 
-	def sum_indecomposable_sequence(self):
-		S = self.downset()
-		return [len([p for p in S if len(p)==i and not p.sum_decomposable()]) for i in range(1,max([len(p) for p in S])+1)]
+	def rank_val(self, i):
+		return len([j for j in range(i+1,len(self)) if self[j] < self[i]])
 
-	def sum_indec_bdd_by(self, n):
-		l = [1]
-		S = list(self.children())
-		while len(S) > 0 and len(S[0]) > 0:
-			l = [len([s for s in S if not s.sum_decomposable()])]+l
-			if l[0] > n:
-				return False
-			S = list(permset.PermSet(S).layer_down())
-		return True
+	def rank_encoding(self):
+		"""Return the rank encoding (Lehmer code) of `self`, the list whose
+		`i`th entry is the number of later entries smaller than `self[i]`,
+		in O(n log n) time.
 
-	def contains_locations(self, Q):
-		locs = []
-		sublocs = itertools.combinations(range(len(self)), len(Q))
-		for subloc in sublocs:
-			if Permutation([self[i] for i in subloc]) == Q:
-				locs.append(subloc)
+		Examples:
+			>>> Permutation(35142).rank_encoding()
+			[2, 3, 0, 1, 0]
+		"""
+		n = len(self)
+		tree = [0]*(n+1) # Fenwick tree of the values seen so far, indexed by value + 1
+		code = [0]*n
+		for idx in range(n-1, -1, -1):
+			val = self[idx]
+			count = 0
+			pos = val
+			while pos > 0:
+				count += tree[pos]
+				pos -= pos & -pos
+			code[idx] = count
+			pos = val + 1
+			while pos <= n:
+				tree[pos] += 1
+				pos += pos & -pos
+		return code
 
-		return locs
+	@classmethod
+	def from_rank_encoding(cls, code):
+		"""Return the permutation whose rank encoding is `code`, in O(n log n)
+		time.
 
-	def rank_val(self, i):
-		return len([j for j in range(i+1,len(self)) if self[j] < self[i]])
+		Raises:
+			ValueError if `code` is not the rank encoding of a permutation.
 
-	def rank_encoding(self):
-		return [self.rank_val(i) for i in range(len(self))]
+		Examples:
+			>>> Permutation.from_rank_encoding([2, 3, 0, 1, 0])
+			3 5 1 4 2
+		"""
+		n = len(code)
+		if any(not 0 <= rank < n - idx for idx, rank in enumerate(code)):
+			raise ValueError(f"{code} is not a rank encoding.")
+
+		# Fenwick tree of the values still available, indexed by value + 1.
+		tree = [0]*(n+1)
+		for pos in range(1, n+1):
+			tree[pos] += 1
+			if pos + (pos & -pos) <= n:
+				tree[pos + (pos & -pos)] += tree[pos]
+		top = 1
+		while top*2 <= n:
+			top *= 2
+
+		entries = []
+		for rank in code:
+			# Descend the tree to the (rank+1)st smallest available value.
+			pos = 0
+			remaining = rank
+			step = top
+			while step:
+				if pos + step <= n and tree[pos + step] <= remaining:
+					pos += step
+					remaining -= tree[pos]
+				step //= 2
+			entries.append(pos)
+			pos += 1
+			while pos <= n:
+				tree[pos] -= 1
+				pos += pos & -pos
+		return cls(entries, clean=True)
 
 	def num_rtlmax_ltrmin_layers(self):
-		return len(self.rtlmax_ltrmin_decomposition())
+		"""Return the number of layers in `self.rtlmax_ltrmin_decomposition()`,
+		in O(n log n) time.
+
+		Examples:
+			>>> Permutation(1324).num_rtlmax_ltrmin_layers()
+			2
+		"""
+		return max(_rtlmax_ltrmin_layers(self), default=0)
 
 	def rtlmax_ltrmin_decomposition(self):
-		P = Permutation(self)
-		num_layers = 0
-		layers = []
-		while len(P) > 0:
-			num_layers += 1
-			positions = sorted(list(set(P.rtlmax()+P.ltrmin())))
-			layers.append(positions)
-			P = Permutation([P[i] for i in range(len(P)) if i not in positions])
-		return layers
+		"""Return the list of layers obtained by repeatedly removing the
+		right-to-left maxima and left-to-right minima of `self`. Each layer
+		lists the positions removed, relative to what remained of `self` when
+		they were removed.
+
+		Notes:
+			Runs in O(n log n) time; see `_rtlmax_ltrmin_layers`.
+
+		Examples:
+			>>> Permutation(1324).rtlmax_ltrmin_decomposition()
+			[[0, 3], [0, 1]]
+			>>> Permutation(31524).rtlmax_ltrmin_decomposition()
+			[[0, 1, 2, 4], [0]]
+		"""
+		rounds = _rtlmax_ltrmin_layers(self)
+		n = len(self)
+		layers = [[] for _ in range(max(rounds, default=0))]
+		for idx, layer in enumerate(rounds):
+			layers[layer-1].append(idx)
+
+		# Fenwick tree counting the positions that have not been removed yet.
+		tree = [0]*(n+1)
+		for idx in range(1, n+1):
+			tree[idx] += 1
+			if idx + (idx & -idx) <= n:
+				tree[idx + (idx & -idx)] += tree[idx]
+
+		result = []
+		for layer in layers:
+			relative = []
+			for idx in layer:
+				count = 0
+				pos = idx
+				while pos > 0:
+					count += tree[pos]
+					pos -= pos & -pos
+				relative.append(count)
+			for idx in layer:
+				pos = idx + 1
+				while pos <= n:
+					tree[pos] -= 1
+					pos += pos & -pos
+			result.append(relative)
+		return result
 
 	def num_inc_bonds(self):
 		return len([i for i in range(len(self)-1) if self[i+1] == self[i]+1])
@@ -166,34 +436,42 @@ class PermutationMiscMixin:
 		return len([i for i in range(len(self)-1) if self[i+1] == self[i]-1])
 
 	def num_bonds(self):
-		return len([i for i in range(len(self)-1) if self[i+1] == self[i]+1 or self[i+1] == self[i]-1])
+		return self.stats_record().bonds
 
 	def contract_inc_bonds(self):
-		P = Permutation(self)
-		while P.num_inc_bonds() > 0:
-			for i in range(0,len(P)-1):
-				if P[i+1] == P[i]+1:
-					P = Permutation(P[:i]+P[i+1:])
-					break
-		return P
+		"""Return the permutation obtained by repeatedly contracting the
+		increasing bonds of `self` to single entries, in O(n) time.
+
+		Examples:
+			>>> Permutation(12534).contract_inc_bonds()
+			1 3 2
+		"""
+		from .permutation import Permutation
+		return Permutation(_standardize_values(_contract(self, dec=False), len(self)), clean=True)
 
 	def contract_dec_bonds(self):
-		P = Permutation(self)
-		while P.num_dec_bonds() > 0:
-			for i in range(0,len(P)-1):
-				if P[i+1] == P[i]-1:
-					P = Permutation(P[:i]+P[i+1:])
-					break
-		return P
+		"""Return the permutation obtained by repeatedly contracting the
+		decreasing bonds of `self` to single entries, in O(n) time.
+
+		Examples:
+			>>> Permutation(21543).contract_dec_bonds()
+			1 2
+		"""
+		from .permutation import Permutation
+		return Permutation(_standardize_values(_contract(self, inc=False), len(self)), clean=True)
 
 	def contract_bonds(self):
-		P = Permutation(self)
-		while P.num_bonds() > 0:
-			for i in range(0,len(P)-1):
-				if P[i+1] == P[i]+1 or P[i+1] == P[i]-1:
-					P = Permutation(P[:i]+P[i+1:])
-					break
-		return P
+		"""Return the permutation obtained by repeatedly contracting the bonds
+		of `self` to single entries, in O(n) time.
+
+		Examples:
+			>>> Permutation(2413).contract_bonds()
+			2 4 1 3
+			>>> Permutation(132).contract_bonds()
+			1
+		"""
+		from .permutation import Permutation
+		return Permutation(_standardize_values(_contract(self), len(self)), clean=True)
 	
 	
 
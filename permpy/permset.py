@@ -1,11 +1,20 @@
 import random
 import fractions
+import bisect
+import itertools
+import multiprocessing
 from functools import reduce
 
 from collections import Counter, defaultdict
 
 from .permutation import Permutation
 from .permmisc import lcm
+from .decomposition import is_separable
+from .statstable import StatsTable
+from .permarray import to_array, from_array
+from .downset import array_covers, array_downset
+from . import batchstats
+from .binarytree import tree_statistics
 
 from .deprecated.permsetdeprecated import PermSetDeprecatedMixin
 
@@ -16,6 +25,49 @@ try:
 except ImportError:
 	mpl_imported = False
 
+_LENGTH_THREE = sorted(Permutation.gen_all(3))
+
+def _containment_signature(p):
+	"""Return the pair (mask, vector) of necessary conditions for containment:
+	if q is contained in p, then the bitmask of length 3 patterns of q is a
+	subset of that of p, and each entry of the vector of q (its inversions,
+	noninversions and number of copies of each length 3 pattern) is at most
+	the corresponding entry for p.
+	"""
+	counts = p.pattern_counts(3)
+	vector = (p.num_inversions(), p.num_noninversions()) + tuple(counts[q] for q in _LENGTH_THREE)
+	mask = sum(1 << idx for idx, q in enumerate(_LENGTH_THREE) if counts[q])
+	return mask, vector
+
+def _submasks(mask):
+	"""Generate the masks whose bits are all set in `mask`."""
+	sub = mask
+	while True:
+		yield sub
+		if not sub:
+			return
+		sub = (sub - 1) & mask
+
+def _uncontained(task):
+	"""Return the (signed) candidates of `task` that contain no permutation
+	of the index, which maps each mask to the list of (vector, perm) pairs
+	with that mask, sorted (see `_containment_signature`).
+
+	Notes:
+		Only the groups whose masks are submasks of the candidate's are
+		looked up, and in each only the prefix with at most as many
+		inversions as the candidate is compared.
+	"""
+	candidates, index = task
+	result = []
+	for p in candidates:
+		mask, vector = _containment_signature(p)
+		if not any(all(a <= b for a, b in zip(q_vector, vector)) and p.involves(q)
+				for group in (index.get(sub) for sub in _submasks(mask)) if group
+				for q_vector, q in itertools.islice(group, bisect.bisect_left(group, ((vector[0]+1,),)))):
+			result.append((p, mask, vector))
+	return result
+
 class PermSet(set, PermSetDeprecatedMixin):
 	"""Represents a set of permutations, and allows statistics to be computed
 	across the set."""
@@ -87,7 +139,7 @@ class PermSet(set, PermSetDeprecatedMixin):
 
 	def by_length(self):
 		"""Return a dictionary stratifying the permutations in `self`."""
-		D = defaultdictionary(PermSet)
+		D = defaultdict(PermSet)
 		for p in self:
 			D[len(p)].add(p)
 		return D
@@ -110,16 +162,66 @@ class PermSet(set, PermSetDeprecatedMixin):
 		"""The default representation doesn't print the entire set, this function does."""
 		return set.__repr__(self)
 
-	def minimal_elements(self):
+	def minimal_elements(self, processes=1, chunk_size=256):
 		"""Return the elements of `self` that are minimal with respect to the 
 		permutation pattern order.
+
+		Notes:
+			The permutations are handled from shortest to longest, each being
+			minimal exactly when it contains none of the minimal elements
+			already found. These are indexed by cheap necessary conditions
+			for containment (see `_containment_signature`): by the bitmask of
+			their length 3 patterns, and within a mask by their vectors, so
+			a candidate only looks up the groups and prefixes that could be
+			contained in it (see `_uncontained`), and full containment is
+			only tested against those.
+
+		Args:
+			processes (int): Number of worker processes sharing the
+				candidates of each length; 1 means work in this process.
+			chunk_size (int): Number of candidates sent to a worker at once.
+
+		Examples:
+			>>> sorted(PermSet([Permutation(12), Permutation(321), Permutation(231), Permutation(1243)]).minimal_elements())
+			[1 2, 3 2 1]
 		"""
+		by_length = defaultdict(list)
+		for p in self:
+			by_length[len(p)].append(p)
 
-		shortest_len = min(len(p) for p in self)
-		shortest_perms = PermSet(p for p in self if len(p) == shortest_len)
-		S = PermSet(p for p in s if p.avoids(B = shortest_perms))
+		minimal = PermSet()
+		index = defaultdict(list)
+		pool = multiprocessing.Pool(processes) if processes != 1 else None
+		try:
+			for length in sorted(by_length):
+				candidates = by_length[length]
+				tasks = [(candidates[start:start+chunk_size], dict(index)) for start in range(0, len(candidates), chunk_size)]
+				if pool is not None and len(tasks) > 1:
+					results = pool.imap(_uncontained, tasks)
+				else:
+					results = map(_uncontained, tasks)
+				for survivors in results:
+					for p, mask, vector in survivors:
+						minimal.add(p)
+						bisect.insort(index[mask], (vector, p))
+		finally:
+			if pool is not None:
+				pool.terminate()
+		return minimal
+
+	def separables(self):
+		"""Return the PermSet of separable permutations in `self`.
 
-		return shortest_perms + S.minimal_elements()
+		Notes:
+			Uses the O(n) stack test directly, without building (or caching)
+			separating trees.
+
+		Examples:
+			>>> len(PermSet.all(5).separables())
+			90
+
+		"""
+		return PermSet(p for p in self if is_separable(p))
 
 	def symmetries(self):
 		"""Return the PermSet of all symmetries of all permutations in `self`."""
@@ -130,12 +232,21 @@ class PermSet(set, PermSetDeprecatedMixin):
 		return PermSet(S)
 
 	def covers(self, verbose=0):
-		"""Return those permutations that `self` covers."""
-		return PermSet(set.union(*[p.covers() for p in self]))
+		"""Return those permutations that `self` covers, computed one length
+		at a time on arrays.
+
+		Examples:
+			>>> sorted(PermSet([Permutation(132), Permutation(231)]).covers())
+			[1 2, 2 1]
+		"""
+		S = PermSet()
+		for length, perms in self._arrays_by_length().items():
+			S.update(from_array(array_covers(perms)))
+		return S
 
 	def covered_by(self):
 		"""Return those permutations that `self` is covered by."""
-		return PermSet(set.union(*[p.covered_by() for p in self]))
+		return PermSet(q for p in self for q in p.iter_covered_by())
 
 	def right_extensions(self, basis=None, test=None, trust=False):
 		"""Return the 'one layer' upset of `self`.
@@ -172,47 +283,53 @@ class PermSet(set, PermSetDeprecatedMixin):
 	def upset(self, up_to_length):
 		"""Return the upset of `self`, stratified by length.
 
-		Args:
-			basis (iter:optional): permutations to avoid. Useful for building classes.
+		Notes:
+			See `iter_upset` to go one level at a time.
+
+		Examples:
+			>>> [len(level) for level in PermSet([Permutation(12), Permutation(21)]).upset(3)]
+			[0, 0, 2, 6]
 		"""
 		if not self:
 			return []
 
-
-		by_length = self.by_length
-		min_length = min(by_length.keys())
-		max_length = max(by_length.keys())
-		upset = [PermSet() for _ in range(min_length)]
-		upset.append(PermSet(by_length[min_length]))
-
+		max_length = max(len(p) for p in self)
 		if max_length > up_to_length:
 			raise ValueError(f"PermSet.upset called with up_to_length = {up_to_length} on a PermSet with a longer permutation.")
 
-		for length in range(min_length+1,max_length+1):
-			prev_length = upset[length-1] + by_length[-1]
-			upset.append(PermSet(set.union(p.covered_by() for p in prev_length)))
-
+		upset = [PermSet() for _ in range(min(len(p) for p in self))]
+		upset.extend(PermSet(level) for level in self.iter_upset(up_to_length))
 		return upset
 
+	def iter_upset(self, height, counts_only=False, memory_budget=None):
+		"""Generate the levels of the upset of `self`, from the length of its
+		shortest permutation up to `height`, keeping only the current level.
 
-	def downset(self):
-		"""Return the downset of `self` as a list."""
-		bottom_edge = PermSet()
-		bottom_edge.update(self)
+		Notes:
+			Levels with more than `memory_budget` permutations are spilled to
+			disk; see `permpy.upset.iter_upset` for the details.
+		"""
+		from .upset import iter_upset
+		return iter_upset(self, height, counts_only=counts_only, memory_budget=memory_budget)
 
-		max_len = max(len(p) for p in self)
-		levels = [PermSet() for _ in range(max_len+1)]
-		for p in self:
-			levels[len(p)].add(p)
+	def downset(self, as_arrays=False):
+		"""Return the downset of `self` as a list, whose ith entry is the
+		PermSet of permutations of length i contained in some member of
+		`self`.
 
-		downset = [None for _ in range(max_len+1)]
+		Notes:
+			Computed on arrays by `permpy.downset.array_downset`, which can
+			also be returned directly (as lexicographically sorted arrays of
+			permutations) with `as_arrays=True`.
 
-		for n in range(max_len,-1,-1):
-			upper = downset[n] + levels[n]
-			lower = upper.covers()
-			downset[n-1] = lower
-			
-		return downset
+		Examples:
+			>>> [len(level) for level in PermSet([Permutation(2413), Permutation(321)]).downset()]
+			[1, 1, 2, 5, 1]
+		"""
+		levels = array_downset(self._arrays_by_length())
+		if as_arrays:
+			return levels
+		return [PermSet(from_array(level)) for level in levels]
 
 	def pattern_counts(self, k):
 		"""Return a dictionary counting the copies of all `k`-perms in each permutation in `self`."""
@@ -221,6 +338,100 @@ class PermSet(set, PermSetDeprecatedMixin):
 			C += pi.pattern_counts(k)
 		return C
 
+	def contract_bonds(self):
+		"""Return a Counter of the bond contractions of the perms in `self`.
+
+		Examples:
+			>>> sorted(PermSet.all(3).contract_bonds().items())
+			[(1, 6)]
+		"""
+		return Counter(p.contract_bonds() for p in self)
+
+	def contract_inc_bonds(self):
+		"""Return a Counter of the increasing bond contractions of the perms
+		in `self`.
+		"""
+		return Counter(p.contract_inc_bonds() for p in self)
+
+	def contract_dec_bonds(self):
+		"""Return a Counter of the decreasing bond contractions of the perms
+		in `self`.
+		"""
+		return Counter(p.contract_dec_bonds() for p in self)
+
+	def monotone_quotients(self):
+		"""Return a Counter of the monotone quotients of the perms in `self`.
+
+		Examples:
+			>>> sorted(PermSet.all(3).monotone_quotients().items())
+			[(1, 2), (1 2, 2), (2 1, 2)]
+		"""
+		return Counter(p.monotone_quotient() for p in self)
+
+	def num_rtlmax_ltrmin_layers(self):
+		"""Return a Counter of the numbers of right-to-left maxima and
+		left-to-right minima layers of the perms in `self`.
+		"""
+		return Counter(p.num_rtlmax_ltrmin_layers() for p in self)
+
+	def stats_table(self, stats):
+		"""Return a StatsTable of the given statistics over `self`, whose
+		permutations must all have the same length.
+
+		Notes:
+			See `permpy.statstable.StatsTable` for the accepted statistics.
+
+		Examples:
+			>>> T = PermSet.all(4).stats_table(['num_inversions', Permutation.major_index])
+			>>> sorted(T.distribution('num_inversions').items())
+			[(0, 1), (1, 3), (2, 5), (3, 6), (4, 5), (5, 3), (6, 1)]
+
+		"""
+		return StatsTable(self, stats)
+
+	def cycle_types(self):
+		"""Return a Counter of the cycle types of the perms in `self`, computed
+		one length at a time on arrays.
+
+		Examples:
+			>>> sorted(PermSet.all(3).cycle_types().items())
+			[((1, 1, 1), 1), ((2, 1), 3), ((3,), 2)]
+		"""
+		C = Counter()
+		for length, perms in self._arrays_by_length().items():
+			C += batchstats.cycle_types(perms)
+		return C
+
+	def orders(self):
+		"""Return a Counter of the group-theoretic orders of the perms in
+		`self`.
+		"""
+		C = Counter()
+		for length, perms in self._arrays_by_length().items():
+			C += batchstats.orders(perms)
+		return C
+
+	def tree_statistics(self):
+		"""Return a Counter of the pairs (depth, width) of the decreasing
+		binary plane trees of the perms in `self`, computed one length at a
+		time on arrays.
+
+		Examples:
+			>>> sorted(PermSet.all(3).tree_statistics().items())
+			[((2, 2), 2), ((3, 1), 4)]
+		"""
+		C = Counter()
+		for length, perms in self._arrays_by_length().items():
+			stats = tree_statistics(perms)
+			C += Counter(zip(stats['depth'].tolist(), stats['width'].tolist()))
+		return C
+
+	def _arrays_by_length(self):
+		by_length = defaultdict(list)
+		for p in self:
+			by_length[len(p)].append(p)
+		return {length: to_array(perms, length) for length, perms in by_length.items()}
+
 	def total_statistic(self, statistic, default=0):
 		"""Return the sum of the given statistic over all perms in `self`.
 
@@ -1,47 +1,162 @@
-from collections import Counter
+from collections import Counter, namedtuple
+
+from .rsk import len_lis, len_lds
+
+StatsRecord = namedtuple('StatsRecord', [
+	'descents',
+	'ascents',
+	'peaks',
+	'valleys',
+	'ltr_min',
+	'rtl_min',
+	'ltr_max',
+	'rtl_max',
+	'fixed_points',
+	'bonds',
+	'major_index',
+	'inversions',
+])
+
+def stats_record(p):
+	"""Compute the `StatsRecord` of the sequence `p` of distinct integers
+	0, ..., len(p)-1: a pass from the left for everything but the
+	right-to-left records and inversions, and a pass from the right with a
+	Fenwick tree for those.
+
+	Examples:
+		>>> stats_record((3, 1, 4, 0, 2))
+		StatsRecord(descents=2, ascents=2, peaks=1, valleys=2, ltr_min=3, rtl_min=2, ltr_max=2, rtl_max=2, fixed_points=1, bonds=0, major_index=2, inversions=6)
+	"""
+	n = len(p)
+	descents = peaks = valleys = bonds = major_index = fixed_points = 0
+	ltr_min = ltr_max = 0
+	low, high = n, -1
+	prev = None
+	rising = None # Whether the previous adjacent pair was an ascent.
+	for idx, val in enumerate(p):
+		if val == idx:
+			fixed_points += 1
+		if val < low:
+			low = val
+			ltr_min += 1
+		if val > high:
+			high = val
+			ltr_max += 1
+		if prev is not None:
+			if prev > val:
+				descents += 1
+				major_index += idx - 1
+				if rising:
+					peaks += 1
+				rising = False
+			else:
+				if rising is False:
+					valleys += 1
+				rising = True
+			if prev - val in (-1, 1):
+				bonds += 1
+		prev = val
+
+	rtl_min = rtl_max = inversions = 0
+	low, high = n, -1
+	tree = [0]*(n+1) # Fenwick tree of the values seen so far, indexed by value + 1
+	for val in reversed(p):
+		if val < low:
+			low = val
+			rtl_min += 1
+		if val > high:
+			high = val
+			rtl_max += 1
+		idx = val
+		while idx > 0:
+			inversions += tree[idx]
+			idx -= idx & -idx
+		idx = val + 1
+		while idx <= n:
+			tree[idx] += 1
+			idx += idx & -idx
+
+	ascents = max(n-1, 0) - descents
+	return StatsRecord(descents, ascents, peaks, valleys, ltr_min, rtl_min,
+		ltr_max, rtl_max, fixed_points, bonds, major_index, inversions)
 
 class PermutationStatsMixin:
 
+	_stats_record = None # Computed on demand by `stats_record`.
+
+	def stats_record(self):
+		"""Return the `StatsRecord` of counts of descents, ascents, peaks,
+		valleys, the four kinds of records, fixed points, bonds, the major
+		index and inversions of `self`. All of them are computed together in
+		O(n log n) time, and cached.
+
+		Examples:
+			>>> Permutation(42561873).stats_record().descents
+			4
+			>>> Permutation(42561873).stats_record().inversions
+			11
+
+		"""
+		if self._stats_record is None:
+			self._stats_record = stats_record(self)
+		return self._stats_record
+
 	def num_fixed_points(self):
-		return len(self.fixed_points())
+		return self.stats_record().fixed_points
 
 	def num_descents(self):
-		return len(self.descents())
+		return self.stats_record().descents
 
 	def num_ascents(self):
-		return len(self.ascents())
+		return self.stats_record().ascents
 
 	def num_peaks(self):
-		return len(self.peaks())
+		return self.stats_record().peaks
 
 	def num_valleys(self):
-		return len(self.valleys())
+		return self.stats_record().valleys
 
 	def num_ltr_min(self):
-		return len(self.ltr_min())
+		return self.stats_record().ltr_min
 
 	def num_rtl_min(self):
-		return len(self.rtl_min())
+		return self.stats_record().rtl_min
 
 	def num_ltr_max(self):
-		return len(self.ltr_max())
+		return self.stats_record().ltr_max
 
 	def num_rtl_max(self):
-		return len(self.rtl_max())
+		return self.stats_record().rtl_max
 
 	def trivial(self):
 		return 0
 
 	def num_inversions(self):
-		return len(self.inversions())
+		return self.stats_record().inversions
 
 	def num_noninversions(self):
-		return len(self.noninversions())
+		n = len(self)
+		return n*(n-1)//2 - self.stats_record().inversions
+
+	def len_lis(self):
+		"""Return the length of the longest increasing subsequence of `self`.
+
+		Examples:
+			>>> Permutation(31524).len_lis()
+			3
+		"""
+		return len_lis(self)
+
+	def len_lds(self):
+		"""Return the length of the longest decreasing subsequence of `self`.
+		"""
+		return len_lds(self)
 
 	def major_index(self):
-		"""Return the major index of `self`.
+		"""Return the major index of `self`, the sum of the (zero-based)
+		positions of its descents.
 		"""
-		return sum(self.descents())
+		return self.stats_record().major_index
 
 	def len_max_run(self):
 		"""Return the length of the longest monotone contiguous subsequence of entries."""
@@ -78,20 +193,46 @@ class PermutationStatsMixin:
 		return True
 
 	def is_simple(self):
-		"""Determine if `self` is simple.
+		"""Determine if `self` is simple, using its (cached) substitution
+		decomposition tree.
+
+		Examples:
+			>>> Permutation(246135).is_simple()
+			True
+			>>> Permutation(251346).is_simple()
+			False
 
-		Todo: Implement this better, if possible.
 		"""
-		(i,j) = self.simple_location()
-		return i == 0
+		if len(self) <= 2:
+			return True
+		root = self.decomposition_tree()
+		return root.kind == 'simple' and all(child.is_leaf() for child in root.children)
+
+	def is_separable(self):
+		"""Determine if `self` is separable, that is, avoids both 2413 and 3142,
+		using its (cached) separating tree.
+
+		Examples:
+			>>> Permutation(2143).is_separable()
+			True
+			>>> Permutation(25314).is_separable()
+			False
+
+		"""
+		self.separating_tree()
+		return self._separable
 
 	def is_strongly_simple(self):
 		return self.is_simple() and all([p.is_simple() for p in self.children()])
 
 	def num_copies(self, other):
 		"""Return the number of copies of `other` in `self`.
+
+		Examples:
+			>>> Permutation(35142).num_copies(231)
+			3
 		"""
-		return len(self.copies(other))
+		return sum(1 for _ in self.iter_locations(other))
 
 	def num_contiguous_copies_of(self, other):
 		"""Return the number of contiguous copies of `other` in `self`.
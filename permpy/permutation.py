@@ -10,8 +10,9 @@ import itertools
 from collections import Counter, defaultdict
 from scipy.special import binom
 
+from .decomposition import decomposition_tree, separating_tree, iter_intervals, num_intervals
 from .permstats import PermutationStatsMixin
-from .permmisc import PermutationMiscMixin
+from .permmisc import PermutationMiscMixin, _standardize_values
 from .deprecated.permdeprecated import PermutationDeprecatedMixin
 
 try:
@@ -34,6 +35,32 @@ def _is_iter(obj):
 	except TypeError:
 		return False
 
+def _octant_min_dist(points):
+	"""Return the least distance x_j + y_j - x_i - y_i over the pairs of
+	points with y_j - y_i >= x_j - x_i >= 0 (or infinity), for points with
+	distinct x-coordinates.
+	"""
+	keys = sorted(set(y - x for x, y in points))
+	rank = {key: len(keys) - idx for idx, key in enumerate(keys)} # largest key gets rank 1
+	size = len(keys)
+	inf = float('inf')
+	tree = [inf]*(size+1) # Fenwick tree of prefix minima of x + y, by rank
+	best = inf
+	for x, y in sorted(points, reverse=True):
+		# Those already seen have larger x; we want those with key >= y - x.
+		pos = rank[y - x]
+		nearest = inf
+		while pos > 0:
+			nearest = min(nearest, tree[pos])
+			pos -= pos & -pos
+		best = min(best, nearest - (x + y))
+		pos = rank[y - x]
+		while pos <= size:
+			if x + y < tree[pos]:
+				tree[pos] = x + y
+			pos += pos & -pos
+	return best
+
 # a class for creating permutation objects
 class Permutation(tuple, 
 				  PermutationStatsMixin, 
@@ -52,6 +79,9 @@ class Permutation(tuple,
 	upper_bound = []
 	bounds_set = False
 	insertion_values = [] # When creating a class, this keeps track of what new values are allowed.
+	_decomposition_tree = None # Computed on demand by `decomposition_tree`.
+	_separating_tree = None # Computed on demand by `separating_tree`,
+	_separable = None       # along with this.
 
 	@classmethod
 	def monotone_increasing(cls, n):
@@ -137,18 +167,95 @@ class Permutation(tuple,
 		for pi in itertools.permutations(range(n)):
 			yield Permutation(pi,clean=True)
 
+	@classmethod
+	def gen_simple(cls, n, basis=None):
+		"""Generate the simple permutations of length `n`, optionally only
+		those avoiding every pattern in `basis`.
+
+		Notes:
+			Every simple permutation of length at least 5 is a one-point
+			extension of a simple permutation one shorter, except for the
+			parallel alternations (such as 246135) and their symmetries, which
+			are added directly. Since an avoidance class is closed downwards,
+			only the simples of the class are extended at each length.
+
+		Args:
+			n (int): length of the permutations to generate.
+			basis (iterable, optional): permutation-like objects to avoid.
+
+		Examples:
+			>>> sorted(Permutation.gen_simple(4))
+			[2 4 1 3, 3 1 4 2]
+			>>> [len(list(Permutation.gen_simple(n))) for n in range(1, 8)]
+			[1, 2, 0, 2, 6, 46, 338]
+			>>> sorted(Permutation.gen_simple(5, basis=[3142]))
+			[2 5 3 1 4]
+
+		"""
+		basis = [Permutation(b) for b in basis] if basis is not None else []
+		def keep(p):
+			return p.is_simple() and p.avoids(B=basis)
+
+		if n <= 4:
+			for p in cls.gen_all(n):
+				if (n <= 2 or p.is_simple()) and p.avoids(B=basis):
+					yield p
+			return
+
+		level = [p for p in cls.gen_all(4) if keep(p)]
+		for m in range(5, n+1):
+			seen = set()
+			candidates = itertools.chain(
+				cls._one_point_extensions(level),
+				cls._parallel_alternations(m))
+			for p in candidates:
+				if p not in seen and keep(p):
+					seen.add(p)
+					if m == n:
+						yield p
+			level = list(seen)
+
+	@classmethod
+	def _one_point_extensions(cls, perms):
+		"""Generate the one-point extensions of the permutations in `perms`
+		whose new entry is not adjacent in both position and value to one of
+		its neighbours (those can never be simple).
+		"""
+		for p in perms:
+			m = len(p) + 1
+			for val in range(m):
+				shifted = [x + (x >= val) for x in p]
+				for idx in range(m):
+					if (idx > 0 and abs(shifted[idx-1] - val) == 1) \
+							or (idx < m-1 and abs(shifted[idx] - val) == 1):
+						continue
+					yield cls(shifted[:idx] + [val] + shifted[idx:], clean=True)
+
+	@classmethod
+	def _parallel_alternations(cls, m):
+		"""Return the parallel alternations of length `m` (for `m` even),
+		such as 2 4 6 1 3 5, together with their symmetries.
+		"""
+		if m % 2:
+			return []
+		p = cls(list(range(1, m, 2)) + list(range(0, m, 2)), clean=True)
+		perms = [p, p.inverse()]
+		perms += [q.reverse() for q in perms]
+		perms += [q.complement() for q in perms]
+		return perms
+
 	@classmethod
 	def list_all(cls, n):
 		"""Return a list of all permutations of length `n`.
 		"""
 		return list(cls.gen_all(n))
 
-        @classmethod
-        def all_perms(cls, n):
-                """Returns a list of all permutations of length `n`. Same as
-                other functions, adding for convenience'
-                """
-            return Perm.list_all(n)
+	@classmethod
+	def all_perms(cls, n):
+		"""Return a list of all permutations of length `n`. Same as
+		`Permutation.list_all`, added for convenience.
+		"""
+		return cls.list_all(n)
 
 	@classmethod
 	def standardize(cls, L):
@@ -607,19 +714,10 @@ class Permutation(tuple,
 		if len(self) == 0:
 			return []
 
-		indices = set()
-		vals = set()
-		for idx, val in enumerate(self[:-1]):
-			# Iterates through the permutation up until the penultimate entry.
-			indices.add(idx)
-			vals.add(val)
-			if indices == vals:
-				component = Permutation(self[:idx+1],clean=True)
-				rest = Permutation((val-idx-1 for val in self[idx+1:]), clean=True)
-				return [component] + rest.sum_decomposition()
-		
-		# If we didn't return already, then self is sum-indecomposable.
-		return [self]
+		root = self.decomposition_tree()
+		if root.kind != 'sum':
+			return [self]
+		return [self._node_pattern(child) for child in root.children]
 
 	def skew_decomposable(self):
 		"""Determine whether the permutation is expressible as the skew sum of
@@ -657,20 +755,10 @@ class Permutation(tuple,
 		if not self:
 			return []
 
-		indices = set()
-		vals    = set()
-		n = len(self)
-		for idx, val in enumerate(self[:-1]):
-			# Iterates through the permutation up until the penultimate entry.
-			indices.add(idx)
-			vals.add(n-val-1)
-			if indices == vals:
-				component = [Permutation((value-(n-idx)+1 for value in self[:idx+1]), clean=True)]
-				rest = Permutation(self[idx+1:],clean=True)
-				return component + rest.skew_decomposition()
-
-		# If we didn't return already, then self is skew-indecomposable.
-		return [self]
+		root = self.decomposition_tree()
+		if root.kind != 'skew':
+			return [self]
+		return [self._node_pattern(child) for child in root.children]
 
 	def descents(self):
 		"""Return the list of (positions of) descents of the permutation.
@@ -789,37 +877,68 @@ class Permutation(tuple,
 			[]
 
 		"""
-		L = [(i,j+i+1) for i, val_i in enumerate(self)\
-					   for j, val_j in enumerate(self[i+1:]) if val_i >= val_j]
-		return L
+		return list(self.iter_inversions())
+
+	def iter_inversions(self):
+		"""Generate the inversions of the permutation in the order of
+		`inversions`, without building the list.
+
+		Notes:
+			Use `num_inversions` to count them in O(n log n) time.
+		"""
+		n = len(self)
+		for i, val_i in enumerate(self):
+			for j in range(i+1, n):
+				if val_i > self[j]:
+					yield (i, j)
 
 	def noninversions(self):
 		"""Return the list of noninversions of the permutation, i.e., the
 		pairs (i,j) such that i < j and self(i) < self(j).
 
+		"""
+		return list(self.iter_noninversions())
+
+	def iter_noninversions(self):
+		"""Generate the noninversions of the permutation in the order of
+		`noninversions`, without building the list.
 		"""
 		n = len(self)
-		L = [(i,j+i+1) for i, val_i in enumerate(self)\
-					   for j, val_j in enumerate(self[i+1:]) if val_i <= val_j]
-		return L
+		for i, val_i in enumerate(self):
+			for j in range(i+1, n):
+				if val_i < self[j]:
+					yield (i, j)
 
 	def breadth(self):
-		"""Return the minimum taxicab distance between any two entries in the permutation.
+		"""Return the minimum taxicab distance between any two entries in the
+		permutation (or its length, if it has fewer than two entries).
 		
+		Notes:
+			Runs in O(n log n) time. Every pair of entries has one entry in
+			one of the four octants above the other, and in each octant the
+			nearest entry is found by a sweep (as for Manhattan minimum
+			spanning trees).
+
 		Examples:
 			>>> Permutation(3142).breadth()
 			3
+			>>> Permutation(2413).breadth()
+			3
 
-		TODO: Currently uses the naive algorithm--can be improved, probably.
 		"""
-
-		min_dist = len(self)
-		for i, j in itertools.combinations(range(len(self)), 2):
-			h_dist = abs(i - j)
-			v_dist = abs(self[i] - self[j])
-			dist = h_dist + v_dist
-			if dist < min_dist:
-				min_dist = dist
+		n = len(self)
+		min_dist = n
+		if n < 2:
+			return min_dist
+		points = list(enumerate(self))
+		octants = [
+			points,
+			[(y, x) for x, y in points],
+			[(-x, y) for x, y in points],
+			[(y, -x) for x, y in points],
+		]
+		for octant in octants:
+			min_dist = min(min_dist, _octant_min_dist(octant))
 		return min_dist
 
 	def bonds(self):
@@ -896,23 +1015,76 @@ class Permutation(tuple,
 					current_run_len = 1
 		return (max_idx, max_len)
 
-	def covered_by(self):
-		"""Return the set of permutations which `self` is covered by."""
-		S = set()
+	def iter_covered_by(self):
+		"""Generate the permutations which `self` is covered by, each exactly
+		once.
+
+		Notes:
+			Inserting a new entry into a run of bonds (entries adjacent in
+			both position and value) gives the same permutation wherever in
+			the run it goes, so insertions are only made at the start of a
+			run: never just right of an entry with value `val`-1 or `val`
+			(before shifting), where `val` is the new value.
+
+		Examples:
+			>>> sorted(Permutation(12).iter_covered_by())
+			[1 2 3, 1 3 2, 2 1 3, 2 3 1, 3 1 2]
+		"""
 		n = len(self)
+		for val in range(n+1):
+			shifted = [x + (x >= val) for x in self]
+			for idx in range(n+1):
+				if idx > 0 and val-1 <= self[idx-1] <= val:
+					continue
+				yield Permutation(shifted[:idx] + [val] + shifted[idx:], clean=True)
+
+	def iter_covers(self):
+		"""Generate the permutations which `self` covers, each exactly once,
+		by deleting only the first entry of each run of bonds.
+
+		Examples:
+			>>> list(Permutation(1243).iter_covers())
+			[1 3 2, 1 2 3]
+
+			The covers are plain Permutations, even for subclasses whose
+			constructors take more arguments:
+
+			>>> from permpy.pegpermutation import PegPermutation
+			>>> sorted(PegPermutation(132, '+-.').iter_covers())
+			[1 2, 2 1]
+		"""
 		for idx, val in enumerate(self):
-			for j in range(val):
-				S.add(self.insert(idx,j))
-			for j in range(val+2,n+1):
-				S.add(self.insert(idx,j))
-		for j in range(n+1):
-			S.add(self.insert(n,j))
-		return S
+			if idx > 0 and abs(self[idx-1] - val) == 1:
+				continue
+			yield Permutation([x - (x > val) for x in self[:idx] + self[idx+1:]], clean=True)
+
+	def covered_by(self):
+		"""Return the set of permutations which `self` is covered by."""
+		return set(self.iter_covered_by())
 
 	def covers(self):
 		"""Return the set of permutations which `self` covers."""
-		S = set(self.delete(values=val) for val in self)
-		return S
+		return set(self.iter_covers())
+
+	def count_covered_by(self):
+		"""Return the number of permutations which `self` is covered by,
+		which is n^2 + 1 for every permutation of length n.
+
+		Examples:
+			>>> Permutation(2413).count_covered_by() == len(Permutation(2413).covered_by())
+			True
+		"""
+		return len(self)**2 + 1
+
+	def count_covers(self):
+		"""Return the number of permutations which `self` covers, the number
+		of its entries minus the number of its bonds.
+
+		Examples:
+			>>> Permutation(1243).count_covers()
+			2
+		"""
+		return len(self) - self.num_bonds() if len(self) else 0
 
 	def upset(self, height, stratified=False):
 		"""Return the upset of `self` using repeated applications of `covered_by`.
@@ -920,24 +1092,34 @@ class Permutation(tuple,
 		Notes:
 			If `stratified` == True, return the upset as a list `L` such that 
 			`L[i]` is the set of permutations of length `i` which contain `self`.
+			See `iter_upset` to go one level at a time.
 
-		Todo:
-			Try to compute this using a more clever method. Probably very difficult.
+		Examples:
+			>>> [len(level) for level in Permutation(21).upset(4, stratified=True)]
+			[0, 0, 1, 5, 23]
 		"""
-		n = len(self)
-		L = [set()]*n
-		L.append( set([self]) )
-		for i in range(n+1, height+1):
-			new_set = set()
-			for perm in L[i-1]:
-				new_set.update(perm.covered_by())
-			L.append(new_set)
-
+		L = [set() for _ in range(len(self))]
+		L.extend(set(level) for level in self.iter_upset(height))
 		if stratified:
 			return L
 		else:
 			return set.union(*L)
 
+	def iter_upset(self, height, counts_only=False, memory_budget=None):
+		"""Generate the levels of the upset of `self`, from length len(self) up
+		to `height`, keeping only the current level.
+
+		Notes:
+			Levels with more than `memory_budget` permutations are spilled to
+			disk; see `permpy.upset.iter_upset` for the details.
+
+		Examples:
+			>>> list(Permutation(231).iter_upset(6, counts_only=True))
+			[1, 10, 78, 588]
+		"""
+		from .upset import iter_upset
+		return iter_upset([self], height, counts_only=counts_only, memory_budget=memory_budget)
+
 	def set_up_bounds(self):
 		"""
 		Notes:
@@ -1065,21 +1247,60 @@ class Permutation(tuple,
 		return (lower_bound[next] == -1 or q[indices[next]] > q[indices[lower_bound[next]]]) \
 		   and (upper_bound[next] == -1 or q[indices[next]] < q[indices[upper_bound[next]]])
 
-	def all_intervals(self, return_patterns=False):
-		blocks = [[],[]]
-		for i in range(2, len(self)):
-			blocks.append([])
-			for j in range (0,len(self)-i+1):
-				if max(self[j:j+i]) - min(self[j:j+i]) == i-1:
-					blocks[i].append(j)
+	def all_intervals(self, return_patterns=False, count_only=False, as_array=False):
+		"""Return the proper intervals of `self` of length at least 2, as the
+		list `blocks` in which `blocks[i]` is the sorted list of starting
+		indices of the intervals of length `i`.
+
+		Notes:
+			The intervals are read off of the decomposition tree, so this takes
+			O(n log n + K) time, where K is the number of intervals.
+
+		Args:
+			return_patterns (bool, optional): Return the list of patterns
+				formed by the intervals instead, ordered by length and then by
+				starting index.
+			count_only (bool, optional): Return only the number K of intervals.
+			as_array (bool, optional): Return a (K, 2) NumPy array whose rows
+				are the (start, length) pairs, ordered by length and then by
+				start.
+
+		Examples:
+			>>> Permutation(21534).all_intervals()
+			[[], [], [0, 3], [2], []]
+			>>> Permutation(21534).all_intervals(return_patterns=True)
+			[2 1, 1 2, 3 1 2]
+			>>> Permutation(21534).all_intervals(count_only=True)
+			3
+
+		"""
+		n = len(self)
+		root = self.decomposition_tree()
+		if count_only:
+			return max(num_intervals(root) - 1, 0)
+
+		# Bucket the intervals by start, then by length, so that each bucket
+		# ends up sorted without sorting.
+		by_start = [[] for _ in range(n)]
+		for start, length, low in iter_intervals(root):
+			if length < n:
+				by_start[start].append((length, low))
+		blocks = [[] for _ in range(max(n, 2))]
+		lows = [[] for _ in range(max(n, 2))]
+		for start, intervals in enumerate(by_start):
+			for length, low in intervals:
+				blocks[length].append(start)
+				lows[length].append(low)
+
+		if as_array:
+			import numpy as np
+			return np.array([(start, length) for length, starts in enumerate(blocks) for start in starts],
+							dtype=np.int64).reshape(-1, 2)
 		if return_patterns:
-			patterns = []
-			for length in range(0, len(blocks)):
-				for start_index in blocks[length]:
-					patterns.append(Permutation(self[start_index:start_index+length]))
-			return patterns
-		else:
-			return blocks
+			return [Permutation((val - low for val in self[start:start+length]), clean=True)
+					for length, starts in enumerate(blocks)
+					for start, low in zip(starts, lows[length])]
+		return blocks
 
 	def all_monotone_intervals(self, with_ones=False):
 		"""Return all monotone intervals of size at least 2.
@@ -1118,62 +1339,175 @@ class Permutation(tuple,
 		return mi
 
 	def monotone_quotient(self):
-		"""Quotient `self` by its monotone intervals."""
+		"""Quotient `self` by its monotone intervals, in O(n) time.
+
+		Notes:
+			Two bonds sharing an entry are necessarily in the same direction,
+			so each maximal monotone interval is represented by its first
+			entry, and every other entry of it follows a bond.
+
+		Examples:
+			>>> Permutation(12543).monotone_quotient()
+			1 2
+			>>> Permutation(132).monotone_quotient()
+			1 2
+
+		"""
+		n = len(self)
+		vals = [val for idx, val in enumerate(self) if idx == 0 or abs(val - self[idx-1]) != 1]
+		return Permutation(_standardize_values(vals, n), clean=True)
+
+	def decomposition_tree(self):
+		"""Return the root of the substitution decomposition tree of `self`,
+		or None if `self` is empty. The tree is computed once, in
+		O(n log n) time, and cached.
+
+		Notes:
+			See `permpy.decomposition.DecompositionNode`.
+
+		Examples:
+			>>> Permutation(1324).decomposition_tree()
+			1 2 3[1, 2 1[1, 1], 1]
+			>>> Permutation(246135).decomposition_tree().kind
+			'simple'
+
+		"""
+		if self._decomposition_tree is None:
+			self._decomposition_tree = decomposition_tree(self)
+		return self._decomposition_tree
+
+	def separating_tree(self):
+		"""Return the separating tree of `self`, or None if `self` is not
+		separable (or is empty). The tree is computed once, in O(n) time, and
+		cached.
+
+		Notes:
+			The tree is made of `permpy.decomposition.DecompositionNode`s of
+			kinds 'sum', 'skew', and 'leaf', and agrees with
+			`decomposition_tree` for separable permutations.
 
-		return Permutation([self[k[0]] for k in self.all_monotone_intervals(with_ones=True)])
+		Examples:
+			>>> Permutation(2143).separating_tree()
+			1 2[2 1[1, 1], 2 1[1, 1]]
+			>>> Permutation(2413).separating_tree() is None
+			True
+
+		"""
+		if self._separable is None:
+			self._separating_tree = separating_tree(self)
+			self._separable = len(self) == 0 or self._separating_tree is not None
+		return self._separating_tree
+
+	def _node_pattern(self, node, last=None):
+		"""Return the pattern formed by the entries covered by `node` (through
+		those covered by `last`, if given), which must form an interval.
+		"""
+		if last is None:
+			last = node
+		low = min(node.low, last.low)
+		return Permutation((val - low for val in self[node.start:last.stop]), clean=True)
 
 	def maximal_interval(self):
-		"""Find the biggest interval, and return (i,j) is one is found, where 
-		i is the size of the interval, and j is the index of the first entry 
-		in the interval.
+		"""Find the biggest proper interval of size at least 2, and return
+		(i,j) if one is found, where i is the size of the interval, and j is
+		the index of the first entry in the interval. Ties are broken by
+		taking the leftmost interval.
 
 		Return (0,0) if no interval is found, i.e., if the permutation is simple.
+
+		Examples:
+			>>> Permutation(21534).maximal_interval()
+			(3, 2)
+			>>> Permutation(2413).maximal_interval()
+			(0, 0)
+
 		"""
-		for i in range(2, len(self))[::-1]:
-			for j in range(0,len(self)-i+1):
-				if max(self[j:j+i]) - min(self[j:j+i]) == i-1:
-					return (i,j)
-		return (0,0)
+		n = len(self)
+		if n <= 2:
+			return (0,0)
+
+		root = self.decomposition_tree()
+		if root.kind == 'simple':
+			# The biggest interval is the biggest child (`max` keeps the first).
+			child = max(root.children, key=len)
+			if len(child) < 2:
+				return (0,0)
+			return (len(child), child.start)
+
+		# Otherwise, drop the smaller of the first and last components.
+		first, last = root.children[0], root.children[-1]
+		if len(last) <= len(first):
+			return (n - len(last), 0)
+		return (n - len(first), first.stop)
 
 	def simple_location(self):
-		"""Search for an interval, and return (i,j) if one is found,
-		where i is the size of the interval, and j is the
-		first index of the interval.
+		"""Search for a shortest proper interval of size at least 2, and return
+		(i,j) if one is found, where i+1 is the size of the interval, and j is
+		the index of the last entry of the interval. Ties are broken by taking
+		the rightmost interval.
 
 		Return (0,0) if no interval is found, i.e., if the permutation is simple.
+
+		Examples:
+			>>> Permutation(25134).simple_location()
+			(1, 4)
+			>>> Permutation(41352).simple_location()
+			(0, 0)
+
 		"""
-		mins = list(self)
-		maxs = list(self)
-		for i in range(1,len(self)-1):
-			for j in reversed(range(i,len(self))):
-				mins[j] = min(mins[j-1], self[j])
-				maxs[j] = max(maxs[j-1], self[j])
-				if maxs[j] - mins[j] == i:
-					return (i,j)
-		return (0,0)
+		n = len(self)
+		if n <= 2:
+			return (0,0)
+
+		# A shortest interval is either the union of two adjacent components
+		# of a sum or skew sum, or a simple permutation inflated by points.
+		candidates = []
+		for node in self.decomposition_tree().nodes():
+			if node.kind == 'simple':
+				if len(node) < n and all(child.is_leaf() for child in node.children):
+					candidates.append((len(node), node.stop-1))
+			elif node.kind != 'leaf':
+				for first, second in zip(node.children, node.children[1:]):
+					if len(first) + len(second) < n:
+						candidates.append((len(first) + len(second), second.stop-1))
+
+		if not candidates:
+			return (0,0)
+		size, last = min(candidates, key=lambda candidate: (candidate[0], -candidate[1]))
+		return (size-1, last)
 
 	def decomposition(self):
-		"""
+		"""Return the pair (base, components) where `base` is simple and `self`
+		is the inflation of `base` by `components`.
+
 		Notes:
-			ME: I don't know what this is.
-		"""
-
-		base = Permutation(self)
-		components = [Permutation([1])for i in range(0,len(base))]
-		while not base.is_simple():
-			assert len(base) == len(components)
-			(i,j) = base.maximal_interval()
-			assert i != 0
-			interval = list(base[j:i+j])
-			new_base = list(base[0:j])
-			new_base.append(base[j])
-			new_base.extend(base[i+j:len(base)])
-			new_components = components[0:j]
-			new_components.append(Permutation(interval))
-			new_components.extend(components[i+j:len(base)])
-			base = Permutation(new_base)
-			components = new_components
-		return (base, components)
+			If `self` is a sum (resp. skew sum), `base` is 1 2 (resp. 2 1), and
+			the smaller of the first and last components is split off from the
+			rest.
+
+		Examples:
+			>>> Permutation(2413).inflate([Permutation(21), Permutation(1), Permutation(1), Permutation(123)]).decomposition()
+			(2 4 1 3, [2 1, 1, 1, 1 2 3])
+			>>> Permutation(21534).decomposition()
+			(1 2, [2 1, 3 1 2])
+
+		"""
+		if self.is_simple():
+			return (self, [Permutation([1]) for _ in range(len(self))])
+
+		root = self.decomposition_tree()
+		if root.kind == 'simple':
+			return (Permutation(root.skeleton(), clean=True),
+					[self._node_pattern(child) for child in root.children])
+
+		children = root.children
+		if len(children[-1]) <= len(children[0]):
+			components = [self._node_pattern(children[0], children[-2]), self._node_pattern(children[-1])]
+		else:
+			components = [self._node_pattern(children[0]), self._node_pattern(children[1], children[-1])]
+		if root.kind == 'sum':
+			return (Permutation([0, 1], clean=True), components)
+		return (Permutation([1, 0], clean=True), components)
 
 	def inflate(self, components):
 		"""Inflate the entries of self by the given components.
@@ -1295,56 +1629,35 @@ class Permutation(tuple,
 		s += '\n' + r'\end{tikzpicture}'
 		return s
 
-	def downset(self):
-		"""Return the downset D of `self` stratified by length."""
-		new_perms = {self : 0}
-		downset = [set([self])]
-
-		for new_length in range(len(self)-1, -1, -1):
-
-			old_perms = new_perms
-			new_perms = dict()
+	def downset(self, processes=1):
+		"""Return the downset D of `self` stratified by length, so that D[i] is
+		the set of patterns of `self` of length i.
 
-			for sigma, start in old_perms.items():
-				for i in range(start, new_length+1):
-					tau = sigma.delete(indices=i)
-					if tau in new_perms:
-						new_perms[tau] = min(new_perms[tau], i)
-					else:
-						new_perms[tau] = i
-
-			downset.append(new_perms)
+		Notes:
+			Computed on packed integers by `permpy.downset.downset`, optionally
+			sharing each level among `processes` worker processes.
 
-		return downset[::-1]
+		Examples:
+			>>> [len(level) for level in Permutation(2413).downset()]
+			[1, 1, 2, 4, 1]
+		"""
+		from .downset import downset
+		return downset(self, processes)
 
-	def downset_profile(self):
+	def downset_profile(self, processes=1):
 		"""Return the downset profile of self.
 
 		Notes
 		    The downset profile is the list of the number of permutations of each
-		    size contained in self.
-		"""
-		new_perms = {self : 0}
-		# downset = [set([pi])]
-		profile = [len(new_perms)]
+		    size contained in self. No Permutations are built along the way; see
+		    `permpy.downset.downset_profile`.
 
-		for new_length in range(len(self)-1, -1, -1):
-
-			old_perms = new_perms
-			new_perms = dict()
-
-			for sigma, start in old_perms.items():
-				for i in range(start, new_length+1):
-					tau = sigma.delete(indices=i)
-					if tau in new_perms:
-						new_perms[tau] = min(new_perms[tau], i)
-					else:
-						new_perms[tau] = i
-
-			# downset.append(new_perms)
-			profile.append(len(new_perms))
-
-		return profile[::-1]
+		Examples:
+			>>> Permutation(2413).downset_profile()
+			[1, 1, 2, 4, 1]
+		"""
+		from .downset import downset_profile
+		return downset_profile(self, processes)
 
 	def symmetries(self):
 		"""Return the set of all symmetries of `self`."""
@@ -1359,12 +1672,28 @@ class Permutation(tuple,
 		return self == sorted(self.symmetries())[0]
 
 	def copies(self, other):
-		"""Return the list of (values corresponding to) copies of `other` in `self`."""
-		copies = []
-		for subseq in itertools.combinations(self,len(other)):
-			if Permutation(subseq) == other:
-				copies.append(subseq)
-		return copies
+		"""Return the list of (values corresponding to) copies of `other` in `self`.
+
+		Examples:
+			>>> Permutation(4132).copies(21)
+			[(3, 0), (3, 2), (3, 1), (2, 1)]
+		"""
+		return list(self.iter_copies(other))
+
+	def iter_copies(self, other, limit=None):
+		"""Generate the (values corresponding to) copies of `other` in `self`
+		without building the full list. See `Permutation.iter_locations`.
+
+		Args:
+			other (Permutation-like object): the pattern to look for.
+			limit (int, optional): stop after this many copies.
+
+		Examples:
+			>>> next(Permutation(4132).iter_copies(12))
+			(0, 2)
+		"""
+		for locs in self.iter_locations(other, limit=limit):
+			yield tuple(self[idx] for idx in locs)
 
 	def contiguous_copies(self, other):
 		"""Return the list of (indices corresponding to) immediate copies of `other` in `self`."""
@@ -1386,7 +1715,7 @@ class Permutation(tuple,
 		max_copies = 0
 		best_perms = []
 		for tau in Permutation.gen_all(n):
-			num_copies = len(tau.copies(self))
+			num_copies = tau.num_copies(self)
 			if num_copies > max_copies:
 				max_copies = num_copies
 				best_perms = [tau]
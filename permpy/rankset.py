@@ -0,0 +1,316 @@
+"""Sets of permutations stored as sorted arrays of their lexicographic ranks.
+
+A `PermSet` is a Python set of `Permutation` tuples, which costs over a
+hundred bytes per member and copies every member on each union or
+difference. A `RankPermSet` instead keeps, for each length (at most 20), the
+sorted array of the distinct lexicographic ranks of its members (see
+`permpy.permarray.lex_ranks`), so that each member costs 8 bytes. The set
+operations are done length by length on these arrays:
+
+- a union sorts the concatenated arrays, which are sorted runs, with a
+  stable (merging) sort, and drops repeated neighbours;
+- membership, intersection and difference look up the ranks of one array in
+  the other with a binary search.
+
+Members are turned back into Permutations only while iterating, a block of
+ranks at a time.
+"""
+
+import math
+
+import numpy as np
+
+from .permutation import Permutation
+from .permarray import to_array, from_array, lex_ranks, from_lex_ranks
+
+
+_MAX_LENGTH = 20
+
+def _sorted_unique(ranks):
+	ranks = np.sort(np.asarray(ranks, dtype=np.int64), kind='stable')
+	if len(ranks) < 2:
+		return ranks
+	keep = np.empty(len(ranks), dtype=bool)
+	keep[0] = True
+	np.not_equal(ranks[1:], ranks[:-1], out=keep[1:])
+	return ranks[keep]
+
+def _member(values, ranks):
+	"""Return the boolean array of which of `values` are in the sorted array
+	`ranks`; the search is several times faster when `values` is sorted too.
+	"""
+	if not len(ranks):
+		return np.zeros(len(values), dtype=bool)
+	idx = np.searchsorted(ranks, values)
+	np.minimum(idx, len(ranks)-1, out=idx)
+	return ranks[idx] == values
+
+class RankPermSet:
+	"""A set of permutations of length at most 20, stored length by length
+	as sorted arrays of lexicographic ranks.
+
+	Notes:
+		Unlike a PermSet this is not a Python set, and it is not modified in
+		place by its operators; `add` and `update` replace the arrays of the
+		lengths they touch.
+
+	Args:
+		perms (iterable, optional): Permutation-like objects, a single
+			Permutation, or another RankPermSet.
+		block_size (int): Number of members turned back into Permutations at
+			once while iterating.
+
+	Raises:
+		ValueError if a permutation is longer than 20.
+
+	Examples:
+		>>> S = RankPermSet(Permutation.gen_all(3)) - RankPermSet([Permutation(123)])
+		>>> S
+		Set of 5 permutations stored as ranks
+		>>> Permutation(231) in S, Permutation(123) in S
+		(True, False)
+		>>> sorted(S & RankPermSet([Permutation(132), Permutation(1234)]))
+		[1 3 2]
+		>>> S == 5
+		False
+
+	"""
+
+	def __init__(self, perms=(), block_size=2**16):
+		self.block_size = block_size
+		self.levels = {}
+		if isinstance(perms, RankPermSet):
+			self.levels = dict(perms.levels)
+			return
+		if isinstance(perms, Permutation):
+			perms = [perms]
+		by_length = {}
+		for p in perms:
+			p = Permutation(p)
+			by_length.setdefault(len(p), []).append(p)
+		for length, level in by_length.items():
+			self.levels[length] = _sorted_unique(lex_ranks(to_array(level, _check_length(length))))
+
+	@classmethod
+	def from_ranks(cls, ranks_by_length, block_size=2**16):
+		"""Return the RankPermSet whose members of each length have the given
+		lexicographic ranks.
+
+		Args:
+			ranks_by_length (dict): Maps each length to an array of ranks, in
+				any order and possibly repeated.
+
+		Examples:
+			>>> sorted(RankPermSet.from_ranks({3: [5, 0, 5]}))
+			[1 2 3, 3 2 1]
+		"""
+		S = cls(block_size=block_size)
+		for length, ranks in ranks_by_length.items():
+			ranks = _sorted_unique(ranks)
+			if len(ranks):
+				S.levels[_check_length(length)] = ranks
+		return S
+
+	@classmethod
+	def from_arrays(cls, perms_by_length, block_size=2**16):
+		"""Return the RankPermSet of the rows of the arrays in
+		`perms_by_length`, which maps each length to an (N, length) array
+		(such as `PermSet._arrays_by_length` returns).
+
+		Examples:
+			>>> len(RankPermSet.from_arrays({2: np.array([[1, 0], [1, 0]])}))
+			1
+		"""
+		return cls.from_ranks({length: lex_ranks(np.asarray(perms).reshape(-1, _check_length(length)))
+			for length, perms in perms_by_length.items()}, block_size)
+
+	@classmethod
+	def all(cls, length):
+		"""Return the set of all permutations of a given length.
+
+		Examples:
+			>>> len(RankPermSet.all(10))
+			3628800
+		"""
+		S = cls()
+		S.levels[_check_length(length)] = np.arange(math.factorial(length), dtype=np.int64)
+		return S
+
+	def __repr__(self):
+		return f"Set of {len(self)} permutations stored as ranks"
+
+	def __len__(self):
+		return sum(len(ranks) for ranks in self.levels.values())
+
+	def __contains__(self, p):
+		p = Permutation(p)
+		ranks = self.levels.get(len(p))
+		if ranks is None:
+			return False
+		return bool(_member(lex_ranks(to_array([p], len(p))), ranks)[0])
+
+	def __iter__(self):
+		for length in sorted(self.levels):
+			ranks = self.levels[length]
+			for start in range(0, len(ranks), self.block_size):
+				yield from from_array(from_lex_ranks(ranks[start:start+self.block_size], length))
+
+	def __eq__(self, other):
+		if not isinstance(other, RankPermSet) and not hasattr(other, '__iter__'):
+			return NotImplemented
+		other = _as_rank_set(other)
+		return self.levels.keys() == other.levels.keys() and all(
+			np.array_equal(ranks, other.levels[length]) for length, ranks in self.levels.items())
+
+	__hash__ = None
+
+	@property
+	def nbytes(self):
+		"""The number of bytes taken by the arrays of ranks."""
+		return sum(ranks.nbytes for ranks in self.levels.values())
+
+	def lengths(self):
+		"""Return the sorted list of the lengths of the members."""
+		return sorted(self.levels)
+
+	def ranks(self, length):
+		"""Return the sorted array of the ranks of the members of length
+		`length`.
+		"""
+		return self.levels.get(length, np.empty(0, dtype=np.int64))
+
+	def array(self, length):
+		"""Return the array whose rows are the members of length `length`, in
+		lexicographic order.
+
+		Examples:
+			>>> RankPermSet([Permutation(21), Permutation(12)]).array(2)
+			array([[0, 1],
+			       [1, 0]], dtype=int8)
+		"""
+		return from_lex_ranks(self.ranks(length), length)
+
+	def get_length(self, length):
+		"""Return the subset of members of length `length`."""
+		return self.from_ranks({length: self.ranks(length)}, self.block_size)
+
+	def isin(self, perms):
+		"""Return the boolean array of which rows of the (N, n) array `perms`
+		(whose rows are permutations) are members.
+
+		Examples:
+			>>> RankPermSet([Permutation(321)]).isin(np.array([[2, 1, 0], [0, 2, 1]]))
+			array([ True, False])
+		"""
+		perms = np.asarray(perms)
+		ranks = self.levels.get(perms.shape[1])
+		if ranks is None:
+			return np.zeros(perms.shape[0], dtype=bool)
+		values = lex_ranks(perms)
+		order = np.argsort(values)
+		found = np.empty(len(values), dtype=bool)
+		found[order] = _member(values[order], ranks)
+		return found
+
+	def _combine(self, others, operation, keep_missing):
+		"""Return the RankPermSet found by folding `operation` over the arrays
+		of each length; lengths missing from `self` are kept only if
+		`keep_missing`.
+		"""
+		levels = dict(self.levels)
+		for other in others:
+			other = _as_rank_set(other)
+			lengths = set(levels) | set(other.levels) if keep_missing else set(levels)
+			for length in lengths:
+				ranks = operation(levels.get(length, np.empty(0, dtype=np.int64)), other.ranks(length))
+				if len(ranks):
+					levels[length] = ranks
+				else:
+					levels.pop(length, None)
+		S = type(self)(block_size=self.block_size)
+		S.levels = levels
+		return S
+
+	def union(self, *others):
+		"""Return the set of permutations in `self` or any of `others`.
+
+		Examples:
+			>>> RankPermSet.all(3).union(RankPermSet.all(4))
+			Set of 30 permutations stored as ranks
+		"""
+		return self._combine(others, lambda a, b: _sorted_unique(np.concatenate([a, b])), True)
+
+	def intersection(self, *others):
+		"""Return the set of permutations in `self` and all of `others`."""
+		return self._combine(others, lambda a, b: a[_member(a, b)], False)
+
+	def difference(self, *others):
+		"""Return the set of permutations in `self` and none of `others`."""
+		return self._combine(others, lambda a, b: a[~_member(a, b)], False)
+
+	def symmetric_difference(self, other):
+		"""Return the set of permutations in exactly one of `self` and
+		`other`.
+
+		Examples:
+			>>> sorted(RankPermSet([Permutation(12), Permutation(21)]) ^ RankPermSet([Permutation(21)]))
+			[1 2]
+		"""
+		return self._combine([other], lambda a, b: _sorted_unique(np.concatenate([a[~_member(a, b)], b[~_member(b, a)]])), True)
+
+	def __or__(self, other):
+		return self.union(other)
+
+	def __add__(self, other):
+		"""Wrapper for union, as for a PermSet."""
+		return self.union(other)
+
+	def __and__(self, other):
+		return self.intersection(other)
+
+	def __sub__(self, other):
+		return self.difference(other)
+
+	def __xor__(self, other):
+		return self.symmetric_difference(other)
+
+	def issubset(self, other):
+		"""Determine whether every member of `self` is in `other`."""
+		other = _as_rank_set(other)
+		return all(_member(ranks, other.ranks(length)).all() for length, ranks in self.levels.items())
+
+	def issuperset(self, other):
+		return _as_rank_set(other).issubset(self)
+
+	def __le__(self, other):
+		return self.issubset(other)
+
+	def __ge__(self, other):
+		return self.issuperset(other)
+
+	def add(self, p):
+		"""Add the permutation `p`, copying the array of its length."""
+		self.update([p])
+
+	def update(self, *others):
+		"""Add the members of each of `others`."""
+		self.levels = self.union(*others).levels
+
+	def to_permset(self):
+		"""Return the members as a PermSet.
+
+		Examples:
+			>>> S = RankPermSet.all(4).to_permset()
+			>>> S, Permutation(2413) in S
+			(Set of 24 permutations, True)
+		"""
+		from .permset import PermSet
+		return PermSet(self)
+
+def _check_length(length):
+	if length > _MAX_LENGTH:
+		raise ValueError(f"A RankPermSet holds permutations of length at most {_MAX_LENGTH}, not {length}.")
+	return length
+
+def _as_rank_set(other):
+	return other if isinstance(other, RankPermSet) else RankPermSet(other)
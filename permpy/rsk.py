@@ -0,0 +1,115 @@
+"""The Robinson-Schensted-Knuth correspondence, and the statistics of a
+permutation that can be read off of its shape.
+"""
+
+from bisect import bisect_left
+from collections import Counter
+
+
+class Tab(object):
+	"""The pair (P, Q) of tableaux produced by `rsk`."""
+
+	def __init__(self, P, Q):
+		self.P = P
+		self.Q = Q
+
+	def __repr__(self):
+		h = len(self.P)
+		sP = 'P = |'
+		sQ = 'Q = |'
+		for i in range(h):
+			for j in range(len(self.P[i])):
+				sP += ('%2i' % self.P[i][j]) + '|'
+				sQ += ('%2i' % self.Q[i][j]) + '|'
+			sP += '\n    |'
+			sQ += '\n    |'
+		return sP[:-6] + '\n' + sQ[:-6]
+
+def rsk(perm):
+	"""Return the insertion and recording tableaux of `perm`, with entries
+	starting from 1. Each insertion takes O(log n) time in each row it
+	passes through.
+
+	Examples:
+		>>> rsk((2, 0, 3, 1))
+		P = | 1| 2|
+		    | 3| 4|
+		Q = | 1| 3|
+		    | 2| 4|
+	"""
+	P = [[]]
+	Q = [[]]
+	for step, val in enumerate(perm, start=1):
+		k = val + 1
+		r = 0
+		while True:
+			if len(P) == r:
+				P.append([])
+				Q.append([])
+			row = P[r]
+			idx = bisect_left(row, k)
+			if idx == len(row):
+				row.append(k)
+				Q[r].append(step)
+				break
+			row[idx], k = k, row[idx]
+			r += 1
+	return Tab(P, Q)
+
+def rsk_shape(perm):
+	"""Return the shape (the list of row lengths) of the tableaux of `perm`,
+	running only the insertion.
+
+	Examples:
+		>>> rsk_shape((2, 0, 3, 1))
+		[2, 2]
+	"""
+	P = [[]]
+	for k in perm:
+		for row in P:
+			idx = bisect_left(row, k)
+			if idx == len(row):
+				row.append(k)
+				break
+			row[idx], k = k, row[idx]
+		else:
+			P.append([k])
+	return [len(row) for row in P]
+
+def len_lis(perm):
+	"""Return the length of the longest increasing subsequence of `perm`
+	(the first row of its shape), by patience sorting in O(n log n) time.
+
+	Examples:
+		>>> len_lis((2, 0, 3, 1, 4))
+		3
+	"""
+	piles = []
+	for val in perm:
+		idx = bisect_left(piles, val)
+		if idx == len(piles):
+			piles.append(val)
+		else:
+			piles[idx] = val
+	return len(piles)
+
+def len_lds(perm):
+	"""Return the length of the longest decreasing subsequence of `perm`
+	(the first column of its shape), by patience sorting in O(n log n) time.
+
+	Examples:
+		>>> len_lds((2, 0, 3, 1, 4))
+		2
+	"""
+	return len_lis([-val for val in perm])
+
+def rsk_shapes(perms):
+	"""Return a Counter of the shapes (as tuples) of the permutations in
+	`perms`, such as a PermSet.
+
+	Examples:
+		>>> import itertools
+		>>> sorted(rsk_shapes(itertools.permutations(range(3))).items())
+		[((1, 1, 1), 1), ((2, 1), 4), ((3,), 1)]
+	"""
+	return Counter(tuple(rsk_shape(perm)) for perm in perms)
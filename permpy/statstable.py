@@ -0,0 +1,192 @@
+"""A columnar table of statistics over a collection of permutations of one
+length.
+"""
+
+from collections import Counter
+
+import numpy as np
+
+from .permutation import Permutation
+from .permarray import to_array, from_array
+from .batchstats import KERNELS
+
+
+def _column(values):
+	"""Return `values` as a one-dimensional array, falling back to an object
+	array for statistics (like lists of positions) that are not scalars.
+	"""
+	try:
+		column = np.asarray(values)
+	except ValueError:
+		column = None
+	if column is None or column.ndim != 1:
+		column = np.empty(len(values), dtype=object)
+		column[:] = values
+	return column
+
+def _key(value):
+	"""Turn a column entry into a hashable, plain Python value, replacing
+	lists (at any depth) by tuples.
+
+	Examples:
+		>>> _key((1, [np.int64(2), [3]]))
+		(1, (2, (3,)))
+	"""
+	if isinstance(value, np.generic):
+		return value.item()
+	if isinstance(value, (list, tuple)):
+		return tuple(_key(item) for item in value)
+	return value
+
+def resolve_statistic(stat):
+	"""Return the pair (name, function) described by `stat`, which is the
+	name of a `Permutation` method, a `Permutation` method, any function
+	taking a permutation, or a pair (name, function).
+
+	Examples:
+		>>> resolve_statistic('num_descents')[0]
+		'num_descents'
+		>>> resolve_statistic(Permutation.num_inversions)[0]
+		'num_inversions'
+		>>> resolve_statistic(('first', lambda p: p[0]))[0]
+		'first'
+	"""
+	if isinstance(stat, tuple):
+		name, func = stat
+		return name, func
+	if isinstance(stat, str):
+		return stat, getattr(Permutation, stat)
+	return stat.__name__, stat
+
+class StatsTable:
+	"""A table of statistics over permutations of a single length, stored as
+	one NumPy array per statistic together with the (N, n) array `perms` of
+	the permutations themselves (one per row).
+
+	Notes:
+		Statistics with a kernel in `permpy.batchstats` (those named after
+		`Permutation` methods such as 'num_descents' and 'num_inversions')
+		are computed on the whole array at once; any others are computed one
+		permutation at a time.
+
+	Args:
+		perms (iterable): Permutations, all of the same length.
+		stats (iterable): Statistics, as accepted by `resolve_statistic`.
+		n (int, optional): The length of the permutations, needed only if
+			`perms` is empty.
+
+	Examples:
+		>>> T = StatsTable(Permutation.gen_all(4), ['num_descents', 'num_inversions'])
+		>>> len(T)
+		24
+		>>> sorted(T.distribution('num_descents').items())
+		[(0, 1), (1, 11), (2, 11), (3, 1)]
+		>>> T.group_by('num_descents')[3].permutations()
+		[4 3 2 1]
+
+	"""
+
+	def __init__(self, perms, stats=(), n=None):
+		if isinstance(perms, np.ndarray):
+			self.perms = perms
+		else:
+			self.perms = to_array(sorted(perms), n)
+		self.columns = {}
+		self._permutations = None
+		for stat in stats:
+			self.add_statistic(stat)
+
+	def __len__(self):
+		return self.perms.shape[0]
+
+	def __getitem__(self, name):
+		return self.columns[name]
+
+	def __repr__(self):
+		return f"StatsTable of {len(self)} permutations of length {self.perms.shape[1]} with columns {list(self.columns)}"
+
+	@property
+	def names(self):
+		return list(self.columns)
+
+	def permutations(self):
+		"""Return the list of permutations in the table, in row order."""
+		if self._permutations is None:
+			self._permutations = from_array(self.perms)
+		return self._permutations
+
+	def add_statistic(self, stat):
+		"""Compute the given statistic (see `resolve_statistic`) for every
+		row, and store it as a column.
+		"""
+		name, func = resolve_statistic(stat)
+		kernel = KERNELS.get(getattr(func, '__name__', None))
+		if kernel is not None and getattr(Permutation, func.__name__, None) is func:
+			self.columns[name] = kernel(self.perms)
+		else:
+			self.columns[name] = _column([func(p) for p in self.permutations()])
+		return self.columns[name]
+
+	def select(self, mask):
+		"""Return the StatsTable of the rows selected by the boolean array
+		(or array of row indices) `mask`.
+
+		Examples:
+			>>> T = StatsTable(Permutation.gen_all(3), ['num_inversions'])
+			>>> len(T.select(T['num_inversions'] == 1))
+			2
+		"""
+		table = StatsTable(self.perms[mask])
+		table.columns = {name: column[mask] for name, column in self.columns.items()}
+		return table
+
+	def _groups(self, names):
+		"""Return the list of distinct values (or tuples of values) of the
+		given columns, and the array giving the index of each row's value.
+		"""
+		columns = [self.columns[name] for name in names]
+		if all(column.dtype != object for column in columns):
+			values, inverse = np.unique(np.stack(columns, axis=1), axis=0, return_inverse=True)
+			keys = [tuple(row) if len(names) > 1 else row[0] for row in values.tolist()]
+			return keys, inverse.reshape(-1)
+		index = {}
+		inverse = np.empty(len(self), dtype=np.int64)
+		for row, values in enumerate(zip(*columns)):
+			key = tuple(_key(value) for value in values)
+			inverse[row] = index.setdefault(key if len(names) > 1 else key[0], len(index))
+		return list(index), inverse
+
+	def group_by(self, *names):
+		"""Split the table by the values of the given columns.
+
+		Returns:
+			dict mapping each value (or tuple of values, if several names are
+			given) to the StatsTable of the rows having it.
+		"""
+		keys, inverse = self._groups(names)
+		order = np.argsort(inverse, kind='stable')
+		bounds = np.cumsum(np.bincount(inverse, minlength=len(keys)))[:-1]
+		return {key: self.select(rows) for key, rows in zip(keys, np.split(order, bounds))}
+
+	def distribution(self, *names):
+		"""Return a Counter of the values of the given column, or of the joint
+		values (as tuples) of several columns.
+
+		Examples:
+			>>> T = StatsTable(Permutation.gen_all(3), ['num_descents', 'num_peaks'])
+			>>> sorted(T.distribution('num_descents', 'num_peaks').items())
+			[((0, 0), 1), ((1, 0), 2), ((1, 1), 2), ((2, 0), 1)]
+		"""
+		keys, inverse = self._groups(names)
+		return Counter(dict(zip(keys, np.bincount(inverse, minlength=len(keys)).tolist())))
+
+	def histogram(self, name):
+		"""Return the arrays (values, counts) of the sorted distinct values of
+		the numeric column `name` and their multiplicities.
+
+		Examples:
+			>>> T = StatsTable(Permutation.gen_all(3), ['num_inversions'])
+			>>> T.histogram('num_inversions')
+			(array([0, 1, 2, 3]), array([1, 2, 2, 1]))
+		"""
+		return np.unique(self.columns[name], return_counts=True)
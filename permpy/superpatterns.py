@@ -0,0 +1,481 @@
+"""Search for superpatterns: permutations containing every permutation of a
+given set of targets.
+
+Candidates are built by right-extension, many at a time with numpy. A
+target that becomes contained when an entry is appended must use that entry
+as its last one, so each candidate keeps the pattern of each of its short
+subsequences (as an index among the prefixes of the targets), and an
+appended entry only ranks itself against these. A branch is abandoned when,
+for some target, the part after the longest prefix already contained
+(its tail) is longer than the entries left; when the tails of the missing
+targets do not all fit in one permutation of the length left (checked
+against every such permutation for short lengths, and otherwise by
+counting, as a permutation of length n has at most min(C(n, k), k!)
+patterns of length k); or when
+the targets of some length still to be found outnumber the sets of that
+many positions still to be used.
+
+The symmetries of the square (inverse, reverse and complement) that fix
+the targets are broken: when the complement is one, only candidates
+starting with an ascent are extended, and a complete candidate is only
+kept if it comes first among its images.
+"""
+
+import itertools
+import multiprocessing
+import random
+from math import comb, factorial
+
+import numpy as np
+
+from .permutation import Permutation
+
+
+_TABLE_LENGTH = 6 # Tails are checked against every permutation up to this length.
+_BATCH_DEPTH = 4 # The last entries, chosen for many candidates at once.
+
+
+def maximal_targets(targets):
+	"""Return the sorted list of the targets not contained in another target;
+	a permutation contains all the targets when it contains these.
+
+	Examples:
+		>>> maximal_targets([Permutation(12), Permutation(132), Permutation(21)])
+		[1 3 2]
+	"""
+	targets = sorted(set(Permutation(t) for t in targets), key=len, reverse=True)
+	kept = []
+	for t in targets:
+		if not any(len(s) > len(t) and s.involves(t) for s in kept):
+			kept.append(t)
+	return sorted(kept)
+
+def is_superpattern(p, targets):
+	"""Determine whether `p` contains every permutation in `targets`.
+
+	Examples:
+		>>> is_superpattern(Permutation(25314), Permutation.gen_all(3))
+		True
+	"""
+	p = Permutation(p)
+	return all(p.involves(t) for t in targets)
+
+def length_lower_bound(targets):
+	"""Return the least length at which a permutation could contain all of
+	`targets`, counting sets of positions for each target length.
+
+	Examples:
+		>>> length_lower_bound(Permutation.gen_all(4))
+		7
+	"""
+	targets = [Permutation(t) for t in targets]
+	if not targets:
+		return 0
+	bound = max(len(t) for t in targets)
+	for k in set(len(t) for t in targets):
+		count = sum(1 for t in targets if len(t) == k)
+		while comb(bound, k) < count:
+			bound += 1
+	return bound
+
+def _standardize(seq):
+	ranks = {value: rank for rank, value in enumerate(sorted(seq))}
+	return tuple(ranks[value] for value in seq)
+
+def _image(perms, symmetry):
+	"""Return the images of the rows of `perms` under the symmetry given by
+	the flags (inverse, reverse, complement), applied in that order.
+	"""
+	inverse, reverse, complement = symmetry
+	if inverse:
+		perms = np.argsort(perms, axis=1)
+	if reverse:
+		perms = perms[:, ::-1]
+	if complement:
+		perms = perms.shape[1] - 1 - perms
+	return perms
+
+def _symmetric(p, symmetry):
+	inverse, reverse, complement = symmetry
+	if inverse:
+		p = p.inverse()
+	if reverse:
+		p = p.reverse()
+	if complement:
+		p = p.complement()
+	return p
+
+def _key(perms):
+	"""Return the rows of `perms`, each preceded by whether it starts with a
+	descent, for ordering candidates against their images.
+	"""
+	if perms.shape[1] < 2:
+		return perms
+	return np.hstack([(perms[:, :1] > perms[:, 1:2]), perms])
+
+def _precedes(first, second):
+	"""Return the boolean array of which rows of `first` come strictly before
+	the matching rows of `second` lexicographically.
+	"""
+	differ = first != second
+	column = differ.argmax(axis=1)
+	rows = np.arange(len(first))
+	return differ.any(axis=1) & (first[rows, column] < second[rows, column])
+
+def _extensions(perms, parents, gaps):
+	"""Return the rows `parents` of `perms` extended by new last entries,
+	inserted below the values `gaps`.
+	"""
+	base = perms[parents]
+	return np.hstack([base + (base >= gaps[:, None]), gaps[:, None]])
+
+def _take(batch, rows):
+	"""Return the batch of the candidates `rows` of `batch`."""
+	perms, present, subsets = batch
+	return perms[rows], present[rows], [None if ids is None else ids[rows] for ids in subsets]
+
+_TAIL_TABLES = {} # (tails, length) -> table, kept for the life of the process.
+
+def _tail_table(tails, width, length):
+	"""Return the array with a row for each permutation of length `length`,
+	marking the patterns in `tails` it does not contain.
+	"""
+	key = (tuple(tails), length)
+	if key not in _TAIL_TABLES:
+		table = np.zeros((factorial(length), len(tails)), dtype=np.float32)
+		for row, s in enumerate(itertools.permutations(range(length))):
+			contained = set(_standardize(c) for k in range(min(length, width)+1) for c in itertools.combinations(s, k))
+			table[row] = [q not in contained for q in tails]
+		_TAIL_TABLES[key] = table
+	return _TAIL_TABLES[key]
+
+class _Search:
+	"""Depth-first search by right-extension for a superpattern of
+	`targets` of the given length.
+
+	Candidates of one length are handled in batches `(perms, present,
+	subsets)`: `perms` holds a candidate in each row, `present` marks the
+	prefix patterns (of the targets, by index) each contains, and
+	`subsets[k]` holds the index of the pattern of each k-element
+	subsequence of each candidate, for k below the length of the longest
+	target (or `self.sink` when that pattern begins no target).
+	"""
+
+	def __init__(self, targets, length):
+		self.targets = maximal_targets(targets)
+		self.length = length
+		width = max((len(t) for t in self.targets), default=0)
+		self.width = width
+
+		prefixes = sorted(set(_standardize(t[:j]) for t in self.targets for j in range(len(t)+1)), key=lambda q: (len(q), q))
+		index = {q: idx for idx, q in enumerate(prefixes)}
+		self.sink = len(prefixes)
+		self.ext = np.full((self.sink+1, width+1), self.sink, dtype=np.intp)
+		for q, idx in index.items():
+			for rank in range(len(q)+1):
+				self.ext[idx, rank] = index.get(_standardize([2*x for x in q] + [2*rank-1]), self.sink)
+		self.ext = self.ext.ravel()
+		self.lengths = np.array([len(t) for t in self.targets], dtype=np.intp)
+		self.paths = np.array([[index[_standardize(t[:j])] for j in range(1, width+1)] for t in self.targets],
+			dtype=np.intp).reshape(len(self.targets), width)
+		self.depths = np.arange(1, width+1)
+		self.target_ids = np.array([index[tuple(t)] for t in self.targets], dtype=np.intp)
+		self.by_length = {k: self.lengths == k for k in set(self.lengths.tolist())}
+
+		tails = sorted(set(_standardize(t[j:]) for t in self.targets for j in range(len(t)+1)), key=lambda q: (len(q), q))
+		tail_index = {q: idx for idx, q in enumerate(tails)}
+		self.tails = np.array([[tail_index[_standardize(t[j:])] for j in range(width+1)] for t in self.targets],
+			dtype=np.intp).reshape(len(self.targets), width+1)
+		self.tail_lengths = np.eye(width+1, dtype=np.float32)[[len(q) for q in tails]]
+		self.tail_tables = {left: _tail_table(tails, width, left) for left in range(min(length, _TABLE_LENGTH)+1)}
+
+		self.incidence = [[np.zeros((0, 1), dtype=np.float32)] + [np.zeros((0, 0), dtype=np.float32)]*(width-1)]
+
+		targets = set(self.targets)
+		self.symmetries = [symmetry for symmetry in itertools.product([False, True], repeat=3) if any(symmetry)
+			and set(_symmetric(t, symmetry) for t in targets) == targets]
+		self.ascent_only = (False, False, True) in self.symmetries and length >= 2
+
+	def subsets(self, m, k):
+		"""Return the (m, C(m, k)) array with a column for each k-subset of
+		range(m), in the order of `subsets[k]` in a batch of length m.
+		"""
+		while len(self.incidence) <= m:
+			previous = self.incidence[-1]
+			level = [np.zeros((len(self.incidence), 1), dtype=np.float32)]
+			for j in range(1, self.width):
+				top = np.hstack([previous[j], previous[j-1]])
+				bottom = np.hstack([np.zeros(previous[j].shape[1]), np.ones(previous[j-1].shape[1])])
+				level.append(np.vstack([top, bottom]).astype(np.float32))
+			self.incidence.append(level)
+		return self.incidence[m][k]
+
+	def state(self, p):
+		"""Return the batch holding the single candidate `p`."""
+		present = np.zeros((1, self.sink+1), dtype=bool)
+		present[0, 0] = True
+		batch = (np.zeros((1, 0), dtype=np.intp), present,
+			[np.zeros((1, 1), dtype=np.intp)] + [np.zeros((1, 0), dtype=np.intp)]*(self.width-1))
+		for idx, value in enumerate(p):
+			gap = sum(1 for x in p[:idx] if x < value)
+			batch = self.children(batch, np.zeros(1, dtype=np.intp), np.array([gap]))
+		return batch
+
+	def children(self, batch, parents, gaps):
+		"""Return the batch of the extensions of the candidates `parents` of
+		`batch` by new last entries, inserted below the values `gaps`.
+
+		Only the subsequences ending at the new entries are examined, by
+		ranking the new entries against the subsequences already indexed.
+		Subsequences too short to matter with the entries left after the
+		extensions are skipped, and are not indexed any more.
+		"""
+		perms, present, indexed = batch
+		m = perms.shape[1]
+		left = self.length - m - 1
+		shortest = max(int(self.lengths.min(initial=0)) - left - 1, 0)
+		base = perms[parents]
+		less = (base < gaps[:, None]).astype(np.float32)
+		present = present[parents]
+		offsets = np.arange(0, present.size, self.sink+1)[:, None]
+		new = [None]*len(indexed)
+		for k, ids in enumerate(indexed):
+			if k >= shortest and ids is not None:
+				# Look the extensions up in the flattened table `ext`.
+				flat = ids[parents] * (self.width+1)
+				flat += (less @ self.subsets(m, k)).astype(np.intp)
+				new[k] = self.ext.take(flat)
+				present.reshape(-1)[new[k] + offsets] = True
+		if left:
+			indexed = [None if shortest else indexed[0][parents]] + [
+				None if new[k-1] is None else np.hstack([indexed[k][parents], new[k-1]])
+				for k in range(1, len(indexed))]
+		return _extensions(perms, parents, gaps), present, indexed
+
+	def viable(self, present, left):
+		"""Return the boolean array of which candidates, with the patterns
+		marked in the rows of `present`, could still contain every target
+		after `left` more entries.
+		"""
+		# Only the longest prefix contained counts: shorter ones may not have
+		# been marked (see `children`).
+		reached = np.minimum((present[:, self.paths] * self.depths).max(axis=2, initial=0), self.lengths)
+		missing = reached < self.lengths
+		viable = ~(missing & (self.lengths - reached > left)).any(axis=1)
+		m = self.length - left
+		for k, kind in self.by_length.items():
+			viable &= missing[:, kind].sum(axis=1) <= comb(self.length, k) - comb(m, k)
+
+		rows, cols = np.nonzero(missing)
+		needed = np.zeros((len(present), len(self.tail_lengths)), dtype=np.float32)
+		needed[rows, self.tails[cols, reached[rows, cols]]] = 1
+		if left in self.tail_tables:
+			viable &= ((needed @ self.tail_tables[left].T) == 0).any(axis=1)
+		else:
+			capacity = [min(comb(left, k), factorial(k)) for k in range(self.width+1)]
+			viable &= ((needed @ self.tail_lengths) <= capacity).all(axis=1)
+		return viable
+
+	def canonical(self, perms):
+		"""Return the boolean array of which rows of `perms` come first among
+		their images under the symmetries fixing the targets.
+		"""
+		key = _key(perms)
+		keep = np.ones(len(perms), dtype=bool)
+		for symmetry in self.symmetries:
+			keep &= ~_precedes(_key(_image(perms, symmetry)), key)
+		return keep
+
+	def complete(self, batch):
+		"""Return the first candidate of `batch` containing every target, or
+		None.
+		"""
+		perms, present, _ = batch
+		done = np.flatnonzero(present[:, self.target_ids].all(axis=1))
+		if not len(done):
+			return None
+		p = perms[done[0]].tolist()
+		return Permutation(p + list(range(len(p), self.length)), clean=True)
+
+	def extend(self, batch):
+		"""Return a superpattern of the target length extending a candidate
+		of `batch`, or None.
+
+		The last `_BATCH_DEPTH` entries are chosen for all the candidates
+		at once.
+		"""
+		found = self.complete(batch)
+		if found is not None or batch[0].shape[1] == self.length:
+			return found
+		if self.length - batch[0].shape[1] > _BATCH_DEPTH:
+			for idx in range(len(batch[0])):
+				found = self.extend_each(_take(batch, [idx]))
+				if found is not None:
+					return found
+			return None
+		while True:
+			m = batch[0].shape[1]
+			parents = np.repeat(np.arange(len(batch[0])), m+1)
+			gaps = np.tile(np.arange(m+1), len(batch[0]))
+			if m == 1 and self.ascent_only:
+				parents, gaps = parents[gaps > 0], gaps[gaps > 0]
+			if m + 2 >= self.length:
+				# Only the last entry can make a candidate canonical.
+				perms = _extensions(batch[0], parents, gaps)
+				if m + 2 == self.length:
+					leaves = np.repeat(np.arange(len(perms)), m+2)
+					keep = self.canonical(_extensions(perms, leaves, np.tile(np.arange(m+2), len(perms))))
+					keep = keep.reshape(len(perms), m+2).any(axis=1)
+				else:
+					keep = self.canonical(perms)
+				parents, gaps = parents[keep], gaps[keep]
+			batch = self.children(batch, parents, gaps)
+			found = self.complete(batch)
+			if found is not None or m + 1 == self.length:
+				return found
+			keep = np.flatnonzero(self.viable(batch[1], self.length-m-1))
+			batch = _take(batch, keep)
+
+	def extend_each(self, batch):
+		"""Extend the single candidate of `batch` by each possible entry in
+		turn, depth first.
+		"""
+		m = batch[0].shape[1]
+		gaps = np.arange(1 if m == 1 and self.ascent_only else 0, m+1)
+		batch = self.children(batch, np.zeros(len(gaps), dtype=np.intp), gaps)
+		return self.extend(_take(batch, np.flatnonzero(self.viable(batch[1], self.length-m-1))))
+
+	def prefixes(self, depth):
+		"""Return the candidates of length `depth` that are still viable."""
+		batch = self.state(Permutation())
+		for m in range(depth):
+			gaps = np.arange(1 if m == 1 and self.ascent_only else 0, m+1)
+			parents = np.repeat(np.arange(len(batch[0])), len(gaps))
+			batch = self.children(batch, parents, np.tile(gaps, len(batch[0])))
+			batch = _take(batch, np.flatnonzero(self.viable(batch[1], self.length-m-1)))
+		return [Permutation(p, clean=True) for p in batch[0].tolist()]
+
+def _extend_prefix(task):
+	targets, length, prefix = task
+	search = _Search(targets, length)
+	return search.extend(search.state(prefix))
+
+def find_superpattern(targets, length, processes=1, prefix_length=4):
+	"""Return a superpattern of `targets` of length `length`, or None if
+	there is none.
+
+	Args:
+		targets (iterable): Permutation-like objects.
+		length (int): Length of the superpattern.
+		processes (int): Number of worker processes, each searching below
+			some of the prefixes of length `prefix_length`; 1 means work in
+			this process.
+		prefix_length (int): Length of the prefixes shared among the workers.
+
+	Examples:
+		>>> find_superpattern(Permutation.gen_all(3), 4) is None
+		True
+		>>> is_superpattern(find_superpattern(Permutation.gen_all(3), 5), Permutation.gen_all(3))
+		True
+		>>> find_superpattern(Permutation.gen_all(4), 8) is None
+		True
+	"""
+	targets = [Permutation(t) for t in targets]
+	search = _Search(targets, length)
+	if processes == 1:
+		return search.extend(search.state(Permutation()))
+	tasks = [(search.targets, length, prefix) for prefix in search.prefixes(min(prefix_length, length))]
+	with multiprocessing.Pool(processes) as pool:
+		for found in pool.imap_unordered(_extend_prefix, tasks):
+			if found is not None:
+				pool.terminate()
+				return found
+	return None
+
+def shortest_superpattern(targets, processes=1, max_length=None):
+	"""Return a shortest permutation containing every permutation in
+	`targets`.
+
+	Notes:
+		A superpattern from `greedy_superpattern` bounds the length from
+		above, and each shorter length from `length_lower_bound(targets)` up
+		is then searched exhaustively; the greedy one is returned when none
+		of them has a superpattern. For all the permutations of length 5 the
+		greedy superpattern has length 13, and showing that no permutation
+		of length 12 contains them takes about two minutes in one process.
+		Beyond that use a pool and patience, or `greedy_superpattern`.
+
+	Args:
+		targets (iterable): Permutation-like objects.
+		processes (int): Number of worker processes (see
+			`find_superpattern`).
+		max_length (int, optional): Give up, returning None, beyond this
+			length. Defaults to the total length of the targets, which always
+			suffices.
+
+	Examples:
+		>>> p = shortest_superpattern(Permutation.gen_all(3))
+		>>> len(p), is_superpattern(p, Permutation.gen_all(3))
+		(5, True)
+		>>> len(shortest_superpattern(Permutation.gen_all(4)))
+		9
+	"""
+	targets = maximal_targets(targets)
+	if max_length is None:
+		max_length = sum(len(t) for t in targets)
+	best = greedy_superpattern(targets, seed=0)
+	for length in range(length_lower_bound(targets), min(max_length+1, len(best))):
+		found = find_superpattern(targets, length, processes)
+		if found is not None:
+			return found
+	return best if len(best) <= max_length else None
+
+def greedy_superpattern(targets, restarts=10, seed=None):
+	"""Return a short (but not necessarily shortest) superpattern of
+	`targets`.
+
+	Notes:
+		Each attempt right-extends by an entry covering the most new targets,
+		breaking ties at random. When no entry covers a new target, the
+		shortest uncovered target is appended above everything (as a direct
+		sum), so every attempt ends. Entries are then deleted for as long as
+		the result stays a superpattern, and the shortest of the `restarts`
+		attempts is returned.
+
+	Examples:
+		>>> p = greedy_superpattern(Permutation.gen_all(4), restarts=3, seed=0)
+		>>> is_superpattern(p, Permutation.gen_all(4))
+		True
+	"""
+	rng = random.Random(seed)
+	targets = maximal_targets(targets)
+	search = _Search(targets, sum(len(t) for t in targets))
+	best = None
+	for _ in range(restarts):
+		batch = search.state(Permutation())
+		while not batch[1][0, search.target_ids].all():
+			m = batch[0].shape[1]
+			children = search.children(batch, np.zeros(m+1, dtype=np.intp), np.arange(m+1))
+			scores = children[1][:, search.target_ids].sum(axis=1)
+			if scores.max() > batch[1][0, search.target_ids].sum():
+				batch = _take(children, [rng.choice(np.flatnonzero(scores == scores.max()).tolist())])
+			else:
+				p = Permutation(batch[0][0].tolist(), clean=True)
+				missing = [t for t, seen in zip(search.targets, batch[1][0, search.target_ids]) if not seen]
+				batch = search.state(p + min(missing, key=len))
+		p = _shrink(Permutation(batch[0][0].tolist(), clean=True), targets)
+		if best is None or len(p) < len(best):
+			best = p
+	return best
+
+def _shrink(p, targets):
+	"""Delete entries of the superpattern `p` while it stays one."""
+	improved = True
+	while improved:
+		improved = False
+		for idx in range(len(p)):
+			q = p.delete(indices=idx)
+			if is_superpattern(q, targets):
+				p, improved = q, True
+				break
+	return p
@@ -0,0 +1,168 @@
+"""Level-by-level generation of upsets, holding one level at a time.
+
+The upset of a set of permutations, stratified by length, is generated one
+level from the previous one with `Permutation.iter_covered_by`. Only the
+current level is kept. When a level would hold more than a given number of
+permutations in memory, the permutations found so far are written to disk
+as a sorted array of their lexicographic ranks (see
+`permpy.permarray.lex_ranks`), and the sorted runs are merged, without
+duplicates, once the level is complete.
+"""
+
+import heapq
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from .permutation import Permutation
+from .permset import PermSet
+from .permarray import to_array, from_array, lex_ranks, from_lex_ranks
+
+
+def _read_ranks(path):
+	"""Return the ranks stored in the file at `path`, memory-mapped."""
+	if not os.path.getsize(path):
+		return np.empty(0, dtype=np.int64)
+	return np.memmap(path, dtype=np.int64, mode='r')
+
+def _iter_ranks(path, block_size):
+	ranks = _read_ranks(path)
+	for start in range(0, len(ranks), block_size):
+		yield from ranks[start:start+block_size].tolist()
+
+class SpilledLevel:
+	"""A level of an upset too large to keep in memory, stored on disk as the
+	sorted array of the lexicographic ranks of its permutations.
+
+	Notes:
+		The file is removed once the generator that produced the level moves
+		on to the next one.
+
+	Attributes:
+		length (int): The length of the permutations.
+		path (str): The file holding the ranks, as raw 64-bit integers.
+	"""
+
+	def __init__(self, length, path, count, block_size):
+		self.length = length
+		self.path = path
+		self.count = count
+		self.block_size = block_size
+
+	def __len__(self):
+		return self.count
+
+	def __repr__(self):
+		return f"SpilledLevel of {self.count} permutations of length {self.length}"
+
+	def ranks(self):
+		"""Return the memory-mapped array of the sorted ranks."""
+		return _read_ranks(self.path)
+
+	def __iter__(self):
+		ranks = self.ranks()
+		for start in range(0, len(ranks), self.block_size):
+			yield from from_array(from_lex_ranks(ranks[start:start+self.block_size], self.length))
+
+class _Frontier:
+	"""Accumulates the permutations of one level, spilling sorted runs of
+	their ranks to `directory` whenever more than `budget` are held.
+	"""
+
+	def __init__(self, length, directory, budget, block_size):
+		self.length = length
+		self.directory = directory
+		self.budget = budget
+		self.block_size = block_size
+		self.perms = set()
+		self.runs = []
+
+	def update(self, perms):
+		self.perms.update(perms)
+		if self.budget is not None and len(self.perms) > self.budget:
+			self._spill()
+
+	def _spill(self):
+		path = os.path.join(self.directory, f"{self.length}-{len(self.runs)}.run")
+		np.unique(lex_ranks(to_array(self.perms, self.length))).tofile(path)
+		self.runs.append(path)
+		self.perms = set()
+
+	def finish(self):
+		"""Return the completed level, as a PermSet if it never spilled and as
+		a SpilledLevel otherwise.
+		"""
+		if not self.runs:
+			return PermSet(self.perms)
+		if self.perms:
+			self._spill()
+		path = os.path.join(self.directory, f"{self.length}.level")
+		count = 0
+		buffer = []
+		previous = None
+		with open(path, 'wb') as f:
+			for rank in heapq.merge(*[_iter_ranks(run, self.block_size) for run in self.runs]):
+				if rank == previous:
+					continue
+				previous = rank
+				buffer.append(rank)
+				if len(buffer) >= self.block_size:
+					np.array(buffer, dtype=np.int64).tofile(f)
+					count += len(buffer)
+					buffer = []
+			np.array(buffer, dtype=np.int64).tofile(f)
+			count += len(buffer)
+		for run in self.runs:
+			os.remove(run)
+		return SpilledLevel(self.length, path, count, self.block_size)
+
+def iter_upset(perms, height, counts_only=False, memory_budget=None, block_size=2**16, directory=None):
+	"""Generate the levels of the upset of `perms`, the permutations of
+	length at most `height` containing one of them.
+
+	Args:
+		perms (iterable): Permutation-like objects.
+		height (int): Length of the last level.
+		counts_only (bool): Whether to yield only the size of each level.
+		memory_budget (int, optional): Most permutations of a level to hold in
+			memory before spilling to disk. Defaults to no limit.
+		block_size (int): Number of ranks read or written at once when
+			working on disk.
+		directory (str, optional): Where to put the spilled levels; a fresh
+			temporary directory (removed afterwards) by default.
+
+	Yields:
+		For each length from the shortest in `perms` up to `height`, the
+		level of that length: a PermSet, a SpilledLevel if it exceeded the
+		memory budget, or its size if `counts_only`. A level is valid only
+		until the next one is requested.
+
+	Examples:
+		>>> list(iter_upset([Permutation(21)], 5, counts_only=True))
+		[1, 5, 23, 119]
+		>>> [len(level) for level in iter_upset([Permutation(21)], 5, memory_budget=10, block_size=8)]
+		[1, 5, 23, 119]
+
+	"""
+	by_length = {}
+	for p in perms:
+		p = Permutation(p)
+		by_length.setdefault(len(p), []).append(p)
+	if not by_length:
+		return
+	workdir = tempfile.mkdtemp(dir=directory, prefix='upset-')
+	try:
+		level = ()
+		for length in range(min(by_length), height+1):
+			frontier = _Frontier(length, workdir, memory_budget, block_size)
+			frontier.update(by_length.get(length, []))
+			for p in level:
+				frontier.update(p.iter_covered_by())
+			if isinstance(level, SpilledLevel):
+				os.remove(level.path)
+			level = frontier.finish()
+			yield len(level) if counts_only else level
+	finally:
+		shutil.rmtree(workdir, ignore_errors=True)
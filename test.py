@@ -1,4 +1,8 @@
 import permpy
+import permpy.equidistribution
+import permpy.upset
+import permpy.patternposet
+import permpy.superpatterns
 import doctest
 
 doctest.testmod(permpy.permutation)
@@ -7,3 +11,18 @@ doctest.testmod(permpy.permutation)
 doctest.testmod(permpy.permset)
 doctest.testmod(permpy.permclass)
 doctest.testmod(permpy.avclass)
+doctest.testmod(permpy.decomposition)
+doctest.testmod(permpy.inflation)
+doctest.testmod(permpy.permarray)
+doctest.testmod(permpy.batchstats)
+doctest.testmod(permpy.statstable)
+doctest.testmod(permpy.equidistribution)
+doctest.testmod(permpy.incremental)
+doctest.testmod(permpy.rsk)
+doctest.testmod(permpy.binarytree)
+doctest.testmod(permpy.montecarlo)
+doctest.testmod(permpy.upset)
+doctest.testmod(permpy.downset)
+doctest.testmod(permpy.patternposet)
+doctest.testmod(permpy.superpatterns)
+doctest.testmod(permpy.rankset)